@@ -0,0 +1,206 @@
+"""
+Fetch-layer benchmark against the offline API simulator (mock_api.py).
+
+    python bench/fetch_bench.py --records 10000,100000 --workers 1,5,10 --limits 500,1000
+    python bench/fetch_bench.py --records 5000000 --fetchers messages --latency 0.1 --burst-every 40
+
+For every dataset size a simulator is started in its own process; every
+fetcher / max_workers / limit / sleep_time combination then runs in a fresh
+Python process with an empty cache folder (a first, full sync into the local
+store) so peak RSS is that run's alone. Pages and records are counted by the
+simulator. Results are printed as a table and can be saved with --out.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import itertools
+import pandas as pd
+import requests
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+# Fetcher name -> (module, function); all are called undecorated, load=False
+FETCHERS = {
+    "chats": ("chats", "fetch_all_chat_data"),
+    "messages": ("msg", "fetch_all_message_data"),
+    "reactions": ("rect", "fetch_all_rection_data"),
+    "notifications": ("notif", "fetch_all_notification_data"),
+}
+
+
+def _ints(text):
+    return [int(float(v)) for v in text.split(",")]
+
+
+def _floats(text):
+    return [float(v) for v in text.split(",")]
+
+
+def run_case(case):
+    """
+    Run one fetcher configuration in this process (see main's --case).
+
+    Args:
+        case (dict): url, fetcher, orgs, max_workers, limit, sleep_time, rate, max_rate.
+
+    Returns:
+        dict: Wall time and peak RSS of the fetch (MB).
+    """
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(tempfile.mkdtemp(prefix="fetch_bench_"))
+
+    import fetcher
+    from ratelimit import LIMITER
+    fetcher.BASE_URL = f"{case['url']}/v1"
+    if case.get("rate"):
+        LIMITER.rate = case["rate"]
+    if case.get("max_rate"):
+        LIMITER.max_rate = case["max_rate"]
+
+    module, name = FETCHERS[case["fetcher"]]
+    func = getattr(__import__(module), name).__wrapped__
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    started = time.perf_counter()
+    if case["fetcher"] == "messages":
+        func("bench", max_workers=case["max_workers"], limit=case["limit"], load=False)
+    else:
+        func("bench", case["orgs"], limit=case["limit"], sleep_time=case["sleep_time"],
+             max_workers=case["max_workers"], load=False)
+    wall = time.perf_counter() - started
+
+    return {
+        "wall_s": wall,
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def start_mock(records, args):
+    """Start mock_api.py in its own process; returns (process, base URL)."""
+    command = [
+        sys.executable, os.path.join(BENCH_DIR, "mock_api.py"),
+        "--records", str(records), "--orgs", str(args.orgs), "--nested", str(args.nested),
+        "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--burst-every", str(args.burst_every), "--burst-length", str(args.burst_length),
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    port = int(process.stdout.readline().split()[-1])
+    return process, f"http://127.0.0.1:{port}"
+
+
+def bench(args):
+    """
+    Run every configuration of the command line.
+
+    Returns:
+        pd.DataFrame: One row per run.
+    """
+    rows = []
+    for records in args.records:
+        process, url = start_mock(records, args)
+        try:
+            orgs = requests.get(f"{url}/_stats", timeout=10).json()["orgs"]
+            for name, workers, limit, sleep in itertools.product(
+                    args.fetchers, args.workers, args.limits, args.sleep):
+                # sleep_time does not apply to the sharded message fetch
+                if name == "messages" and sleep != args.sleep[0]:
+                    continue
+                case = {"url": url, "fetcher": name, "orgs": orgs, "max_workers": workers,
+                        "limit": limit, "sleep_time": sleep, "rate": args.rate, "max_rate": args.max_rate}
+
+                before = requests.get(f"{url}/_stats", timeout=10).json()
+                out = subprocess.run(
+                    [sys.executable, __file__, "--case", json.dumps(case)],
+                    capture_output=True, text=True,
+                )
+                if out.returncode:
+                    print(f"❌ {name} workers={workers} limit={limit} sleep={sleep} failed:\n{out.stderr[-2000:]}")
+                    continue
+                result = json.loads(out.stdout.strip().splitlines()[-1])
+                after = requests.get(f"{url}/_stats", timeout=10).json()
+
+                pages = after["pages"] - before["pages"]
+                fetched = after["records"] - before["records"]
+                row = {
+                    "dataset": records,
+                    "fetcher": name,
+                    "max_workers": workers,
+                    "limit": limit,
+                    "sleep_time": sleep,
+                    "pages": pages,
+                    "records": fetched,
+                    "throttled": after["throttled"] - before["throttled"],
+                    "MB_served": round((after["bytes"] - before["bytes"]) / 2**20, 1),
+                    "wall_s": round(result["wall_s"], 2),
+                    "pages_per_s": round(pages / result["wall_s"], 1),
+                    "records_per_s": round(fetched / result["wall_s"]),
+                    "peak_rss_mb": round(result["peak_rss_mb"], 1),
+                    "import_rss_mb": round(result["rss_before_mb"], 1),
+                }
+                rows.append(row)
+                print(f"[{name}] dataset={records} workers={workers} limit={limit} sleep={sleep}: "
+                      f"{row['records_per_s']} rec/s, {row['pages_per_s']} pages/s, "
+                      f"{row['wall_s']}s, peak {row['peak_rss_mb']} MB", flush=True)
+        finally:
+            process.terminate()
+            process.wait()
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Periskope fetchers against mock_api.py.")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--records", type=_ints, default=[10_000],
+                        help="Comma-separated dataset sizes, total records (default: 10000)")
+    parser.add_argument("--fetchers", type=lambda s: s.split(","), default=list(FETCHERS),
+                        help=f"Comma-separated subset of {','.join(FETCHERS)}")
+    parser.add_argument("--workers", type=_ints, default=[5], help="max_workers values (default: 5)")
+    parser.add_argument("--limits", type=_ints, default=[1000], help="Page sizes (default: 1000)")
+    parser.add_argument("--sleep", type=_floats, default=[0.0], help="sleep_time values (default: 0)")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Override the rate limiter's starting requests/s")
+    parser.add_argument("--max-rate", type=float, default=None,
+                        help="Override the rate limiter's max requests/s")
+    parser.add_argument("--orgs", type=int, default=4, help="Simulated org phones (default: 4)")
+    parser.add_argument("--nested", type=int, default=0,
+                        help="Serve messages nested in chat records, N per record (default: flat)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per page (default: 0.05)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra seconds per page")
+    parser.add_argument("--burst-every", type=int, default=0, help="429 burst period in requests (default: off)")
+    parser.add_argument("--burst-length", type=int, default=3, help="429s per burst (default: 3)")
+    parser.add_argument("--out", help="Save the results (.csv or .json)")
+    args = parser.parse_args()
+
+    if args.case:
+        # Child process: the fetcher's own output goes to stderr, the result is the last stdout line
+        stdout, sys.stdout = sys.stdout, sys.stderr
+        result = run_case(json.loads(args.case))
+        stdout.write(json.dumps(result) + "\n")
+        return
+
+    unknown = set(args.fetchers) - set(FETCHERS)
+    if unknown:
+        parser.error(f"unknown fetchers {sorted(unknown)}")
+
+    results = bench(args)
+    if results.empty:
+        return
+    print(results.to_string(index=False))
+    if args.out:
+        if args.out.endswith(".json"):
+            results.to_json(args.out, orient="records", indent=2)
+        else:
+            results.to_csv(args.out, index=False)
+        print(f"📄 Saved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Offline Periskope API simulator for the fetch benchmarks (see fetch_bench.py).
+
+    python bench/mock_api.py --records 100000 --latency 0.05 --burst-every 50
+
+Serves /v1/chats, /v1/chats/messages, /v1/reactions and /v1/chats/notifications
+with offset/limit pagination, x-phone org filtering and start_time/end_time
+windows. Records are generated from their index, newest first, so datasets of
+millions of records cost no memory. GET /_stats returns the served page,
+record and 429 counts; the first stdout line is "listening on <port>".
+"""
+import argparse
+import json
+import math
+import threading
+import time
+import random
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# endpoint -> (entity, response key, days of history)
+ENDPOINTS = {
+    "chats": ("chats", "chats", 365),
+    "chats/messages": ("messages", "messages", 30),
+    "reactions": ("reactions", "reactions", 60),
+    "chats/notifications": ("notifications", "notifications", 60),
+}
+
+# Share of the total dataset size per entity
+SHARES = {"chats": 0.01, "messages": 0.7, "reactions": 0.19, "notifications": 0.1}
+
+MESSAGE_TYPES = ["chat", "image", "video", "text", "audio", "sticker"]
+REACTIONS = ["👍", "❤️", "😂", "🙏", "😮"]
+WORDS = "the district meeting is moved to next week please share with your group members".split()
+
+
+def _mix(i, salt=0):
+    """Cheap deterministic pseudo-random int of a record index."""
+    return ((i + salt) * 2654435761) & 0xFFFFFFFF
+
+
+class Dataset:
+    """
+    Deterministic records of every entity, split evenly over `orgs` org phones.
+
+    Args:
+        records (int): Total records over all entities (see SHARES).
+        orgs (int): Number of org phones.
+        nested (int): Messages per chat-level record on chats/messages; 0 serves flat messages.
+    """
+
+    def __init__(self, records=100_000, orgs=4, nested=0):
+        self.orgs = [f"9190000000{k:02d}" for k in range(orgs)]
+        self.nested = nested
+        self.end = datetime.now(timezone.utc).replace(microsecond=0)
+        self.sizes = {e: max(1, int(records * share) // orgs) for e, share in SHARES.items()}
+        self.chats_per_org = self.sizes["chats"]
+
+    def step(self, entity, days):
+        return timedelta(days=days) / self.sizes[entity]
+
+    def window(self, entity, days, start_time=None, end_time=None):
+        """Index range [lo, hi) of an org's records within the time window (newest first)."""
+        step = self.step(entity, days).total_seconds()
+        lo, hi = 0, self.sizes[entity]
+        if end_time:
+            end = datetime.strptime(end_time, TIME_FORMAT).replace(tzinfo=timezone.utc)
+            lo = max(lo, math.ceil((self.end - end).total_seconds() / step))
+        if start_time:
+            start = datetime.strptime(start_time, TIME_FORMAT).replace(tzinfo=timezone.utc)
+            hi = min(hi, math.floor((self.end - start).total_seconds() / step) + 1)
+        return lo, max(lo, hi)
+
+    def timestamp(self, entity, days, i):
+        return (self.end - self.step(entity, days) * i).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+    def chat_id(self, org, i):
+        return f"{org}-{i % self.chats_per_org}@g.us"
+
+    def record(self, entity, days, org, i):
+        r = _mix(i, int(org) & 0xFFFF)
+        ts = self.timestamp(entity, days, i)
+        if entity == "chats":
+            return {
+                "chat_id": self.chat_id(org, i),
+                "chat_name": f"Group {org[-2:]}-{i}",
+                "chat_type": "user" if r % 10 == 0 else "group",
+                "org_phone": org,
+                "created_at": ts,
+                "latest_message": {"timestamp": ts, "body": WORDS[r % len(WORDS)]},
+                "members": {f"91{(r + k) % 10**10:010d}@c.us": {"role": "member"} for k in range(r % 20)},
+            }
+        if entity == "messages":
+            return {
+                "message_id": f"{org}-m{i}",
+                "chat_id": self.chat_id(org, r),
+                "org_phone": f"{org}@c.us",
+                "sender_phone": f"91{r % 5000:010d}@c.us",
+                "message_type": MESSAGE_TYPES[r % len(MESSAGE_TYPES)],
+                "body": " ".join(WORDS[(r + k) % len(WORDS)] for k in range(r % 40)),
+                "timestamp": ts,
+                "media": {"size": r % 100000, "mimetype": "image/jpeg"} if r % 5 == 1 else None,
+            }
+        if entity == "reactions":
+            return {
+                "reaction_id": f"{org}-r{i}",
+                "message_id": f"{org}-m{r % self.sizes['messages']}",
+                "chat_id": self.chat_id(org, r),
+                "org_phone": org,
+                "sender_phone": f"91{r % 5000:010d}@c.us",
+                "reaction": REACTIONS[r % len(REACTIONS)],
+                "timestamp": ts,
+            }
+        return {
+            "notification_id": f"{org}-n{i}",
+            "chat_id": self.chat_id(org, r),
+            "org_phone": org,
+            "type": ["add", "leave", "remove", "promote"][r % 4],
+            "timestamp": ts,
+        }
+
+    def page(self, endpoint, org, offset, limit, start_time=None, end_time=None):
+        """
+        Records of one page; without an org phone all orgs are served one after the other.
+
+        Returns:
+            list: Page records (nested chat-level records on chats/messages if `nested`).
+        """
+        entity, _, days = ENDPOINTS[endpoint]
+        lo, hi = self.window(entity, days, start_time, end_time)
+        orgs = [org] if org else self.orgs
+        per_org = hi - lo
+        unit = self.nested if entity == "messages" and self.nested else 1
+
+        records = []
+        first = offset * unit
+        for index in range(first, min(first + limit * unit, per_org * len(orgs))):
+            o, i = divmod(index, per_org)
+            records.append(self.record(entity, days, orgs[o], lo + i))
+
+        if unit == 1:
+            return records
+        return [
+            {"chat_id": chunk[0]["chat_id"], "org_phone": chunk[0]["org_phone"], "messages": chunk}
+            for chunk in (records[k:k + unit] for k in range(0, len(records), unit))
+        ]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Periskope-style endpoints over a Dataset, with latency and 429 bursts."""
+
+    dataset = None
+    latency = 0.0
+    jitter = 0.0
+    burst_every = 0
+    burst_length = 0
+    retry_after = 1
+    protocol_version = "HTTP/1.1"
+
+    stats = {"requests": 0, "pages": 0, "records": 0, "throttled": 0, "bytes": 0}
+    _lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/_stats":
+            return self._send(200, json.dumps({**self.stats, "orgs": self.dataset.orgs}).encode())
+
+        endpoint = url.path.removeprefix("/v1/").strip("/")
+        if endpoint not in ENDPOINTS:
+            return self._send(404, b'{"error": "not found"}')
+
+        with self._lock:
+            n = self.stats["requests"]
+            self.stats["requests"] += 1
+            throttled = self.burst_every and n % self.burst_every >= self.burst_every - self.burst_length
+            if throttled:
+                self.stats["throttled"] += 1
+        if throttled:
+            return self._send(429, b'{"error": "rate limited"}', {"Retry-After": str(self.retry_after)})
+
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.random() * self.jitter)
+
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        body, count = _page_body(endpoint, self.headers.get("x-phone"), int(q.get("offset", 0)),
+                                 int(q.get("limit", 1000)), q.get("start_time"), q.get("end_time"))
+        with self._lock:
+            self.stats["pages"] += 1
+            self.stats["records"] += count
+            self.stats["bytes"] += len(body)
+        self._send(200, body)
+
+
+@lru_cache(maxsize=256)
+def _page_body(endpoint, org, offset, limit, start_time, end_time):
+    page = MockHandler.dataset.page(endpoint, org, offset, limit, start_time, end_time)
+    count = sum(len(r["messages"]) if "messages" in r else 1 for r in page)
+    return json.dumps({ENDPOINTS[endpoint][1]: page}).encode(), count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Periskope API simulator.")
+    parser.add_argument("--port", type=int, default=0, help="Port (default: any free port)")
+    parser.add_argument("--records", type=int, default=100_000, help="Total records over all entities")
+    parser.add_argument("--orgs", type=int, default=4, help="Number of org phones")
+    parser.add_argument("--nested", type=int, default=0,
+                        help="Serve messages nested in chat records, N per record (default: flat)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every page")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra seconds per page (0..N)")
+    parser.add_argument("--burst-every", type=int, default=0,
+                        help="Every N requests, answer the last --burst-length with 429 (default: off)")
+    parser.add_argument("--burst-length", type=int, default=3)
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After of a 429, in seconds")
+    args = parser.parse_args()
+
+    MockHandler.dataset = Dataset(args.records, args.orgs, args.nested)
+    MockHandler.latency = args.latency
+    MockHandler.jitter = args.jitter
+    MockHandler.burst_every = args.burst_every
+    MockHandler.burst_length = args.burst_length
+    MockHandler.retry_after = args.retry_after
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), MockHandler)
+    server.daemon_threads = True
+    print(f"listening on {server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Stage-by-stage benchmark of the dashboard pipeline on synthetic data (synth.py).
+
+    python bench/pipeline_bench.py --scale medium
+    python bench/pipeline_bench.py --scale large --save-baseline
+    python bench/pipeline_bench.py --groups 20000 --districts 100 --messages 5000000
+
+Runs headless (no Streamlit): every preprocessing step of pipeline.preprocess,
+the cube build, each slide of slides.py and its charts are timed on their own
+(best of --repeat runs). Timings are compared with the stored baseline of the
+same scale in bench/baselines/; a stage slower than the baseline by more than
+--tolerance (and --min-delta seconds) is a regression and the exit code is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+import slides
+from charts import CHARTS
+from cubes import build_cubes
+from pipeline import (
+    preprocess, build_chat_df, add_day_columns, normalize_messages, restrict_to_groups,
+    compact, attach_chat_meta,
+)
+from synth import generate
+
+
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+
+# Named generate() arguments
+SCALES = {
+    "small": dict(groups=200, districts=10, messages=100_000),
+    "medium": dict(groups=2_000, districts=30, messages=1_000_000),
+    "large": dict(groups=10_000, districts=60, messages=5_000_000),
+}
+
+# slides.py function -> stage label
+SLIDES = {
+    "topline": "slide1_topline",
+    "district_activity": "slide2_district_groupby",
+    "membership_movement": "slide3_membership",
+    "message_patterns": "slide4_reaction_join",
+    "district_rankings": "slide5_ranking",
+}
+
+
+class Timer:
+    """Collects the best (minimum) time of every named stage over repeated runs."""
+
+    def __init__(self):
+        self.best = {}
+
+    def __call__(self, name, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        self.best[name] = min(elapsed, self.best.get(name, np.inf))
+        return result
+
+
+def run_stages(data, timer):
+    """
+    Time every pipeline stage once, in the order the dashboard runs them.
+
+    The preprocessing steps are timed one by one (mirroring pipeline.preprocess)
+    and then as the single preprocess call the app makes, whose output feeds
+    the cube and slide stages.
+    """
+    chat_df = timer("chat_mapping_merge", build_chat_df, data["chats"], data["lookup"])
+    msg_df = timer("to_datetime_messages", add_day_columns, data["messages"].copy())
+    rec_df = timer("to_datetime_reactions", add_day_columns, data["reactions"].copy())
+    noti_df = timer("to_datetime_notifications", add_day_columns, data["notifications"].copy())
+    msg_df = timer("normalize_messages", normalize_messages, msg_df)
+
+    group_ids = chat_df['chat_id'].unique().tolist()
+    msg_df, rec_df, noti_df = timer(
+        "restrict_to_groups",
+        lambda: tuple(restrict_to_groups(df, group_ids) for df in (msg_df, rec_df, noti_df)),
+    )
+    timer("compact_categoricals", compact, [chat_df, msg_df, rec_df, noti_df])
+    timer("merged_msg_df", attach_chat_meta, msg_df, chat_df)
+
+    frames = timer("preprocess_total", preprocess, data["chats"], data["messages"], data["reactions"],
+                   data["notifications"], data["lookup"])
+    cubes = timer("build_cubes", build_cubes, frames)
+
+    today = cubes["max_date"]
+    start_date, end_date = slides.default_range(cubes)
+    for name, label in SLIDES.items():
+        args = slides.slide_args(name, today, start_date, end_date)
+        result = timer(label, getattr(slides, name), cubes, *args)
+        timer(f"{label}_charts", CHARTS[name], result)
+
+
+def baseline_path(label):
+    return os.path.join(BASELINE_DIR, f"pipeline_{label}.json")
+
+
+def compare(timings, baseline, tolerance, min_delta):
+    """
+    Stage table with the change against the baseline.
+
+    Returns:
+        pd.DataFrame: stage, seconds, baseline, change (%) and regression flag.
+    """
+    report = pd.DataFrame({"stage": list(timings), "seconds": list(timings.values())})
+    base = (baseline or {}).get("stages", {})
+    report["baseline"] = report["stage"].map(base)
+    report["change_%"] = ((report["seconds"] / report["baseline"] - 1) * 100).round(1)
+    report["regression"] = (
+        (report["seconds"] > report["baseline"] * (1 + tolerance))
+        & (report["seconds"] - report["baseline"] > min_delta)
+    )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each stage of the dashboard pipeline on synthetic data.")
+    parser.add_argument("--scale", choices=list(SCALES), default="small",
+                        help="Preset data size (default: small); overridden by the options below")
+    parser.add_argument("--groups", type=int)
+    parser.add_argument("--districts", type=int)
+    parser.add_argument("--messages", type=lambda v: int(float(v)))
+    parser.add_argument("--days", type=int, default=60, help="Days of history (default: 60)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage, best is kept (default: 3)")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown against the baseline (default: 0.25 = 25%%)")
+    parser.add_argument("--min-delta", type=float, default=0.02,
+                        help="Ignore slowdowns smaller than this many seconds (default: 0.02)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these timings as the baseline")
+    parser.add_argument("--out", help="Also save the report (.csv or .json)")
+    args = parser.parse_args()
+
+    params = dict(SCALES[args.scale])
+    for key in ("groups", "districts", "messages"):
+        if getattr(args, key) is not None:
+            params[key] = getattr(args, key)
+    params.update(days=args.days, seed=args.seed)
+    custom = any(getattr(args, k) is not None for k in ("groups", "districts", "messages"))
+    label = f"{params['groups']}g_{params['districts']}d_{params['messages']}m" if custom else args.scale
+
+    started = time.perf_counter()
+    # Fixed end so every run and the baseline see the same days
+    data = generate(**params, end=pd.Timestamp("2025-06-30 18:00", tz="UTC"))
+    print(f"🧪 {label}: {params} generated in {time.perf_counter() - started:.1f}s "
+          f"({', '.join(f'{k}: {len(v):,}' for k, v in data.items())})")
+
+    timer = Timer()
+    for _ in range(args.repeat):
+        run_stages(data, timer)
+
+    path = baseline_path(label)
+    baseline = None
+    if os.path.exists(path):
+        with open(path) as f:
+            baseline = json.load(f)
+    report = compare(timer.best, baseline, args.tolerance, args.min_delta)
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+
+    if args.out:
+        if args.out.endswith(".json"):
+            report.to_json(args.out, orient="records", indent=2)
+        else:
+            report.to_csv(args.out, index=False)
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                "params": params,
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "machine": platform.machine(),
+                "stages": timer.best,
+            }, f, indent=2)
+        print(f"📄 Baseline saved to {path}")
+        return
+
+    if baseline is None:
+        print(f"ℹ️ No baseline for {label} yet (--save-baseline to create one)")
+        return
+    regressions = report[report["regression"]]
+    if not regressions.empty:
+        print(f"❌ {len(regressions)} stage(s) regressed: {', '.join(regressions['stage'])}")
+        sys.exit(1)
+    print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Synthetic Periskope data at configurable scale, shaped like the local store.
+
+    from synth import generate
+    data = generate(groups=5000, districts=60, messages=2_000_000)
+
+Frames come out as store.read_entity returns them (schema.normalize dtypes)
+plus the chat mapping as mapping.chat_lookup returns it, so they feed
+pipeline.preprocess directly. Activity is skewed like real groups: a few
+busy groups carry most messages and a few messages most reactions.
+"""
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from schema import normalize
+
+
+MESSAGE_TYPES = ["chat", "text", "image", "video", "audio", "sticker", "document"]
+MESSAGE_TYPE_P = [0.45, 0.15, 0.2, 0.08, 0.05, 0.05, 0.02]
+REACTIONS = ["👍", "❤️", "😂", "🙏", "😮", "😢", None]
+REACTION_P = [0.4, 0.25, 0.12, 0.12, 0.05, 0.04, 0.02]
+NOTIFICATION_TYPES = ["add", "leave", "remove", "promote"]
+NOTIFICATION_P = [0.55, 0.3, 0.1, 0.05]
+GROUP_TYPES = ["District", "Block", "State"]
+GROUP_TYPE_P = [0.7, 0.25, 0.05]
+
+WORDS = ("meeting district block training report please share update today week "
+         "members group photo attendance survey campaign village health school").split()
+
+
+def _phones(numbers, suffix="@c.us"):
+    return ("91" + pd.Series(numbers).astype(str).str.zfill(10) + suffix).to_numpy(dtype=object)
+
+
+def _timestamps(rng, end, days, n):
+    offsets = (rng.random(n) * days * 86400e9).astype(np.int64)
+    return pd.to_datetime(end.value - offsets, utc=True)
+
+
+def generate(
+    groups=1000,
+    districts=30,
+    messages=1_000_000,
+    members=60,
+    reactions_per_message=0.3,
+    notifications_per_group=20,
+    days=60,
+    orgs=4,
+    unmapped=0.05,
+    seed=0,
+    end=None,
+):
+    """
+    Generate chats, messages, reactions, notifications and the chat mapping.
+
+    Args:
+        groups (int): Group chats (plus 10% one-to-one chats).
+        districts (int): Districts in the mapping (10 per state).
+        messages (int): Messages over all groups (at least 1).
+        members (int): Distinct senders per group, on average.
+        reactions_per_message (float): Reactions per message, on average.
+        notifications_per_group (int): Add/leave/... notifications per group.
+        days (int): Days of history ending at `end`.
+        orgs (int): Org phones the chats are spread over.
+        unmapped (float): Share of group chats missing from the mapping.
+        seed (int): Random seed; equal arguments give equal data.
+        end (pd.Timestamp, optional): Newest timestamp (default: now, UTC).
+
+    Returns:
+        dict: chats, messages, reactions, notifications (store-shaped frames)
+            and lookup (mapping indexed by chat_id).
+    """
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end or pd.Timestamp.now(tz="UTC"))
+    org_phones = _phones(np.arange(orgs) + 9000000000, suffix="")
+
+    # ---------------- Chats and mapping ----------------
+    n_chats = groups + groups // 10
+    chat_ids = np.array([f"1203630{i:08d}@g.us" for i in range(n_chats)], dtype=object)
+    chat_org = rng.integers(0, orgs, n_chats)
+    chats = pd.DataFrame({
+        "chat_id": chat_ids,
+        "chat_name": [f"Group {i}" for i in range(n_chats)],
+        "chat_type": np.where(np.arange(n_chats) < groups, "group", "user"),
+        "org_phone": org_phones[chat_org],
+        "created_at": _timestamps(rng, end - pd.Timedelta(days=days), 400, n_chats),
+        "last_message_at": _timestamps(rng, end, 2, n_chats),
+    })
+
+    district_names = np.array([f"District {d:03d}" for d in range(districts)], dtype=object)
+    state_names = np.array([f"State {d // 10:02d}" for d in range(districts)], dtype=object)
+    mapped = np.flatnonzero(rng.random(groups) >= unmapped)
+    chat_district = rng.integers(0, districts, len(mapped))
+    lookup = pd.DataFrame({
+        "chat_id": chat_ids[mapped],
+        "chats_name": [f"G{i}" for i in mapped],
+        "Group type": rng.choice(GROUP_TYPES, len(mapped), p=GROUP_TYPE_P),
+        "District Name": district_names[chat_district],
+        "State Name": state_names[chat_district],
+        "Block": np.array([f"Block {b:04d}" for b in rng.integers(0, districts * 8, len(mapped))], dtype=object),
+    }).set_index("chat_id")
+
+    # ---------------- Messages ----------------
+    # Zipf-like activity: group k gets weight 1 / (k + 1)^0.8
+    weights = 1 / np.arange(1, groups + 1) ** 0.8
+    msg_chat = rng.choice(groups, messages, p=weights / weights.sum())
+    population = max(1, groups * members // 3)
+    sender = (msg_chat * 7919 + rng.integers(0, members, messages)) % population
+    bodies = np.array([" ".join(rng.choice(WORDS, rng.integers(1, 40))) for _ in range(2000)], dtype=object)
+    msg_ts = _timestamps(rng, end, days, messages)
+    msg_df = pd.DataFrame({
+        "message_id": "m" + pd.Series(np.arange(messages)).astype(str),
+        "chat_id": chat_ids[msg_chat],
+        "org_phone": org_phones[chat_org[msg_chat]] + "@c.us",
+        "sender_phone": _phones(np.arange(population) + 7000000000)[sender],
+        "message_type": rng.choice(MESSAGE_TYPES, messages, p=MESSAGE_TYPE_P),
+        "body": bodies[rng.integers(0, len(bodies), messages)],
+        "timestamp": msg_ts,
+    })
+
+    # ---------------- Reactions ----------------
+    n_reactions = int(messages * reactions_per_message)
+    popularity = rng.pareto(1.5, messages) + 1e-9
+    reacted = rng.choice(messages, n_reactions, p=popularity / popularity.sum())
+    delay = pd.to_timedelta(rng.exponential(3600, n_reactions), unit="s")
+    rec_df = pd.DataFrame({
+        "reaction_id": "r" + pd.Series(np.arange(n_reactions)).astype(str),
+        "message_id": msg_df["message_id"].to_numpy()[reacted],
+        "chat_id": chat_ids[msg_chat[reacted]],
+        "org_phone": org_phones[chat_org[msg_chat[reacted]]],
+        "reaction": rng.choice(np.array(REACTIONS, dtype=object), n_reactions, p=REACTION_P),
+        "timestamp": pd.Series(msg_ts[reacted] + delay).clip(upper=end).array,
+    })
+
+    # ---------------- Notifications ----------------
+    n_notifications = groups * notifications_per_group
+    noti_chat = rng.integers(0, groups, n_notifications)
+    noti_df = pd.DataFrame({
+        "notification_id": "n" + pd.Series(np.arange(n_notifications)).astype(str),
+        "chat_id": chat_ids[noti_chat],
+        "org_phone": org_phones[chat_org[noti_chat]],
+        "type": rng.choice(NOTIFICATION_TYPES, n_notifications, p=NOTIFICATION_P),
+        "timestamp": _timestamps(rng, end, days, n_notifications),
+    })
+
+    return {
+        "chats": normalize(chats, "chats"),
+        "messages": normalize(msg_df, "messages"),
+        "reactions": normalize(rec_df, "reactions"),
+        "notifications": normalize(noti_df, "notifications"),
+        "lookup": lookup,
+    }
@@ -0,0 +1,170 @@
+import plotly.express as px
+from perf import traced
+
+
+# Plotly figures of the five slides, built from the output of the matching
+# slides.py function. Kept free of Streamlit so snapshots can prebuild them.
+
+# ========================= CUSTOM COLOR SCALE ========================
+custom_scale = [
+    "#8B0000",  # dark red (highest)
+    "#CD0000",  # little dark red
+    "#FF6347",  # little dark light red
+    "#FFA07A",  # light red
+    "#00FF00",  # light green
+    "#00e500",  # dark light green
+    "#00b200",  # less dark green
+    "#007f00"   # dark green (lowest)
+]
+
+#---------------------------- Chart Layout ------------------------------
+
+def apply_default_plotly_style(fig, title_color="#198754"):
+    fig.update_layout(
+        plot_bgcolor="#f9fafb",
+        paper_bgcolor="#f9fafb",
+
+        font=dict(color="black"),  # all text black
+
+        # Chart Title
+        title_font=dict(color=title_color, size=20),
+
+        # Axis styling
+        xaxis=dict(
+            title_font=dict(color="black"),
+            tickfont=dict(color="black"),
+            linecolor="black",
+            tickcolor="black",
+            mirror=True
+        ),
+        yaxis=dict(
+            title_font=dict(color="black"),
+            tickfont=dict(color="black"),
+            linecolor="black",
+            tickcolor="black",
+            mirror=True
+        ),
+
+        # Legend styling (for discrete legends)
+        legend=dict(
+            title_font=dict(color="black"),
+            font=dict(color="black"),
+            bordercolor="black",
+            borderwidth=1
+        ),
+
+        # ⭐ Color bar styling (for continuous scales)
+        coloraxis_colorbar=dict(
+            title=dict(font=dict(color="black")),
+            tickfont=dict(color="black"),
+            outlinecolor="black",
+            outlinewidth=1
+        ),
+
+        margin=dict(l=40, r=40, t=60, b=40)
+    )
+
+    # Bar borders
+    fig.update_traces(marker_line_color="black")
+
+    return fig
+
+
+def _group_bar(df, x, title):
+    fig = px.bar(df, x=x, y="Group Count",
+                 color="Group Count", text="Group Count",
+                 title=title,
+                 color_continuous_scale=custom_scale)
+    return apply_default_plotly_style(fig)
+
+
+@traced()
+def topline_charts(topline):
+    """Slide 1: groups by district, by state and by block / group type (None when missing)."""
+    return [
+        _group_bar(topline["dist_grp"], "District Name", "Groups by District"),
+        _group_bar(topline["state_grp"], "State Name", "Groups by State") if topline["state_grp"] is not None else None,
+        _group_bar(topline["type_grp"], topline["type_col"], "Groups By Type") if topline["type_col"] else None,
+    ]
+
+
+@traced()
+def district_activity_charts(data):
+    """Slide 2: active members vs groups of the top 5 districts (None without activity)."""
+    if data is None or data[1] is None:
+        return [None]
+    _, melted = data
+    fig4 = px.bar(
+        melted,
+        x="District Name",
+        y="Count",
+        color="Count",  # numeric for color scale
+        text="Count",
+        barmode="group",
+        title="Top 5 Districts: Active Members vs Groups",
+        color_continuous_scale=custom_scale
+    )
+    return [apply_default_plotly_style(fig4)]
+
+
+@traced()
+def membership_movement_charts(data):
+    """Slide 3: 6-week join/leave trend."""
+    _, trend = data
+
+    # Custom color mapping: add=green, leave=red
+    color_map = {
+        "add": "green",
+        "leave": "red"
+    }
+
+    fig5 = px.line(
+        trend,
+        x="date_new",
+        y="Count",
+        color="type",
+        markers=True,
+        title="6-Week Join/Leave Trend",
+        color_discrete_map=color_map
+    )
+    return [apply_default_plotly_style(fig5)]
+
+
+@traced()
+def message_patterns_charts(data):
+    """Slide 4: top reactions (None without reactions)."""
+    _, reaction_counts, _ = data
+    if reaction_counts is None:
+        return [None]
+    fig6 = px.bar(
+        reaction_counts,
+        x='Reaction', y='Count', text='Count',
+        color='Count', color_continuous_scale=custom_scale,
+        title="Top Reactions to Messages"
+    )
+    return [apply_default_plotly_style(fig6)]
+
+
+@traced()
+def district_rankings_charts(ranking):
+    """Slide 5: composite score of the top 5 districts."""
+    fig7 = px.bar(
+        ranking.head(5),
+        x="District Name",
+        y="Comp Score",
+        title="Top 5 Districts by Composite Score",
+        color="Comp Score",
+        color_continuous_scale=custom_scale,
+        text="Comp Score"
+    )
+    return [apply_default_plotly_style(fig7)]
+
+
+# slides.py function name -> chart builder
+CHARTS = {
+    "topline": topline_charts,
+    "district_activity": district_activity_charts,
+    "membership_movement": membership_movement_charts,
+    "message_patterns": message_patterns_charts,
+    "district_rankings": district_rankings_charts,
+}
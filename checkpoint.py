@@ -0,0 +1,109 @@
+import json
+import os
+import time
+import shutil
+import hashlib
+import threading
+
+
+CHECKPOINT_DIR = os.path.join("cache", "checkpoints")
+
+# Checkpoints older than this are discarded: offsets drift as new data arrives
+CHECKPOINT_TTL = 6 * 3600
+
+
+def checkpoint_dir(endpoint, org_phone, params, limit):
+    """
+    Folder holding the page segments of one paginated fetch.
+
+    The folder is keyed by endpoint, org phone and a hash of the query params,
+    so a rerun with the same window resumes while a different window starts fresh.
+    Time shards pass their aligned bounds (see fetcher.shard_bounds) so the
+    first and last shard of a sliding window keep their key between runs.
+
+    Returns:
+        str: Path of the checkpoint folder (not created yet).
+    """
+    key = json.dumps({"params": params or {}, "limit": limit}, sort_keys=True)
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    return os.path.join(CHECKPOINT_DIR, endpoint.replace("/", "_"), org_phone or "all", digest)
+
+
+def save_params(folder, params):
+    """Record the query params a checkpointed fetch was started with."""
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, "params.json")
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(params or {}, f)
+    os.replace(tmp, path)
+
+
+def load_params(folder):
+    """Query params saved by save_params (None if there are none)."""
+    path = os.path.join(folder, "params.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def mark_done(folder):
+    """Record that a checkpointed fetch reached its last page (kept until its records are stored)."""
+    os.makedirs(folder, exist_ok=True)
+    open(os.path.join(folder, "done"), "w").close()
+
+
+def is_done(folder):
+    """True if mark_done was called for this folder."""
+    return os.path.exists(os.path.join(folder, "done"))
+
+
+def save_page(folder, offset, records):
+    """Atomically write one completed page as an NDJSON segment named by its offset."""
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{offset:012d}.ndjson")
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for r in records:
+            f.write(json.dumps(r, ensure_ascii=False))
+            f.write("\n")
+    os.replace(tmp, path)
+
+
+def iter_checkpoint(folder, limit):
+    """
+    Yield the contiguous run of page segments left by an interrupted fetch.
+
+    Args:
+        folder (str): Checkpoint folder from checkpoint_dir.
+        limit (int): Page size the segments were fetched with.
+
+    Yields:
+        tuple: (offset, records) of each checkpointed page, in offset order.
+    """
+    if not os.path.isdir(folder):
+        return
+
+    segments = sorted(f for f in os.listdir(folder) if f.endswith(".ndjson"))
+    if not segments:
+        return
+
+    newest = max(os.path.getmtime(os.path.join(folder, f)) for f in segments)
+    if time.time() - newest > CHECKPOINT_TTL:
+        clear_checkpoint(folder)
+        return
+
+    next_offset = 0
+    for name in segments:
+        offset = int(name.split(".")[0])
+        if offset != next_offset:
+            break  # gap: only resume from the last contiguous page
+        with open(os.path.join(folder, name), encoding="utf-8") as f:
+            yield offset, [json.loads(line) for line in f if line.strip()]
+        next_offset = offset + limit
+
+
+def clear_checkpoint(folder):
+    """Remove the segments of a finished fetch."""
+    shutil.rmtree(folder, ignore_errors=True)
@@ -0,0 +1,116 @@
+import pandas as pd
+from pipeline import NO_DAY, date_slice
+from perf import traced
+
+
+# Daily cube keys; every cube holds one "count" per key combination and is
+# sorted by day, so date ranges are cut with pipeline.date_slice.
+MESSAGE_KEYS = ['day', 'State Name', 'District Name', 'Block', 'chat_id', 'sender_phone', 'message_type']
+REACTION_KEYS = ['day', 'State Name', 'District Name', 'chat_id', 'message_id', 'reaction']
+NOTIFICATION_KEYS = ['day', 'State Name', 'District Name', 'chat_id', 'type']
+
+
+def build_cube(df, keys):
+    """
+    Count the rows of a preprocessed frame per day and key combination.
+
+    Rows without a timestamp are dropped (they fall in no date range); missing
+    key values are kept as their own group so totals are preserved.
+
+    Args:
+        df (pd.DataFrame): Day-sorted frame from pipeline.preprocess.
+        keys (list): Grouping columns, starting with 'day' (absent ones are skipped).
+
+    Returns:
+        pd.DataFrame: keys + date_new + count, sorted by day.
+    """
+    keys = [k for k in keys if k in df.columns]
+    df = df[df['day'] != NO_DAY]
+    cube = df.groupby(keys, dropna=False, sort=False, observed=True).size().reset_index(name='count')
+    cube = cube.sort_values('day', kind="stable", ignore_index=True)
+    cube['date_new'] = pd.to_datetime(cube['day'].astype('int64'), unit='D')
+    return cube
+
+
+def group_counts(chat_df, col):
+    """Number of distinct chats per value of a chat metadata column."""
+    return chat_df.groupby(col, observed=True)["chat_id"].nunique().reset_index(name="Group Count")
+
+
+@traced()
+def build_cubes(frames):
+    """
+    Pre-aggregate the preprocessed frames into everything the slides read.
+
+    Built once per data version; the slides then only sum cube rows over
+    their date range, whatever the raw message volume.
+
+    Args:
+        frames (dict): Output of pipeline.preprocess.
+
+    Returns:
+        dict:
+            messages / reactions / notifications: daily cubes (see build_cube)
+            message_text: message_id, chats_name, body of the reacted messages
+            total_groups: number of mapped group chats
+            dist_grp / state_grp: group counts by district / state (state_grp may be None)
+            type_col, type_grp: column and group counts of the Block / Group type chart (may be None)
+            min_date / max_date: sidebar date bounds
+    """
+    chat_df = frames["chat_df"]
+    msg_df = frames["msg_df"]
+    rec_df = frames["rec_df"]
+
+    # Chat metadata on reactions and notifications as well
+    meta = [c for c in ['chat_id', 'State Name', 'District Name'] if c in chat_df.columns]
+    rec_df = rec_df.merge(chat_df[meta], on='chat_id', how='left')
+    noti_df = frames["noti_df"].merge(chat_df[meta], on='chat_id', how='left')
+
+    # Groups by District
+    district_df = chat_df[chat_df['Group type'] == 'District']
+    district_df_unique = district_df.drop_duplicates(subset=['chat_id', 'District Name'])
+
+    # Groups by Mandal / Group Type
+    if "Block" in chat_df.columns and chat_df["Block"].notna().any():
+        type_col = "Block"
+    elif "Group type" in chat_df.columns:
+        type_col = "Group type"
+    else:
+        type_col = None
+
+    # Text of the reacted messages, for the top messages table
+    reacted = msg_df[msg_df['message_id'].isin(rec_df['message_id'])]
+    message_text = reacted[['message_id', 'chats_name', 'body']].drop_duplicates(subset=['message_id'])
+
+    return {
+        "messages": build_cube(msg_df, MESSAGE_KEYS),
+        "reactions": build_cube(rec_df, REACTION_KEYS),
+        "notifications": build_cube(noti_df, NOTIFICATION_KEYS),
+        "message_text": message_text.reset_index(drop=True),
+        "total_groups": chat_df['chat_id'].nunique(),
+        "dist_grp": group_counts(district_df_unique, "District Name"),
+        "state_grp": group_counts(chat_df, "State Name") if "State Name" in chat_df.columns else None,
+        "type_col": type_col,
+        "type_grp": group_counts(chat_df, type_col) if type_col else None,
+        "min_date": frames["min_date"],
+        "max_date": frames["max_date"],
+    }
+
+
+def rollup(cube, by, start_date=None, end_date=None, name='count'):
+    """
+    Sum a cube's counts over a date range, grouped by some of its keys.
+
+    Args:
+        cube (pd.DataFrame): Cube from build_cube.
+        by (list): Key columns to keep (rows with a missing key are dropped).
+        start_date (date, optional): First day (inclusive); needs end_date.
+        end_date (date, optional): Last day (inclusive).
+        name (str): Name of the summed column (default='count').
+
+    Returns:
+        pd.DataFrame: `by` columns + `name`.
+    """
+    if start_date is not None:
+        cube = date_slice(cube, start_date, end_date)
+    return cube.groupby(by, observed=True)['count'].sum().reset_index(name=name)
@@ -0,0 +1,291 @@
+import requests
+import time
+import threading
+from datetime import datetime, timedelta, timezone
+from requests.adapters import HTTPAdapter
+from ratelimit import LIMITER, parse_retry_after
+from checkpoint import (
+    checkpoint_dir, iter_checkpoint, save_page, save_params, load_params, mark_done, is_done, clear_checkpoint,
+)
+from perf import span
+
+
+BASE_URL = "https://api.periskope.app/v1"
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+SHARD_SIZES = {"day": timedelta(days=1), "hour": timedelta(hours=1)}
+
+# Status codes worth retrying (after backing off) instead of ending pagination
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# One pooled Session per worker thread (requests.Session is not thread-safe)
+_local = threading.local()
+
+
+def get_session(pool_size=10):
+    """
+    Return the calling thread's pooled requests.Session, creating it on first use.
+
+    The session keeps TLS connections to api.periskope.app alive between pages
+    and asks for gzip-compressed responses.
+
+    Args:
+        pool_size (int): Max connections kept alive per host (default=10).
+
+    Returns:
+        requests.Session: Session bound to the current thread.
+    """
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+        _local.session = session
+    return session
+
+
+def get_page(url, headers, params, limiter=None, max_retries=5, timeout=60, label=""):
+    """
+    GET one page through the shared rate limiter, retrying throttled or failed requests.
+
+    Args:
+        url (str): Full endpoint URL.
+        headers (dict): Request headers.
+        params (dict): Query params of this page.
+        limiter (AdaptiveRateLimiter, optional): Defaults to the process-wide ratelimit.LIMITER.
+        max_retries (int): Retries of a 429/5xx/connection error before giving up (default=5).
+        timeout (float): Request timeout in seconds (default=60).
+        label (str): Prefix for log lines.
+
+    Returns:
+        requests.Response: The final response (non-retryable errors are returned as-is).
+
+    Raises:
+        requests.RequestException: If the page still fails after max_retries.
+    """
+    limiter = limiter or LIMITER
+    session = get_session()
+
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            response = session.get(url, headers=headers, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == max_retries:
+                raise
+            print(f"⚠️ {label}: {e.__class__.__name__}, retrying page (attempt {attempt + 1})")
+            limiter.on_throttle(attempt=attempt)
+            continue
+
+        if response.status_code not in RETRY_STATUS:
+            if response.status_code == 200:
+                limiter.on_success(response.elapsed.total_seconds())
+            return response
+
+        if attempt == max_retries:
+            response.raise_for_status()
+
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        print(f"⚠️ {label}: {response.status_code}, retrying page in {retry_after or 2 ** attempt}s")
+        limiter.on_throttle(retry_after, attempt=attempt)
+
+
+def iter_pages(
+    api_key,
+    org_phone=None,
+    endpoint="chats",
+    result_keys=("results",),
+    limit=1000,
+    params=None,
+    sleep_time=0.0,
+    stop_on_short_page=False,
+    limiter=None,
+    checkpoint=True,
+    checkpoint_key=None,
+    finished=None,
+):
+    """
+    Walk every offset page of a Periskope endpoint for one org phone, yielding each page as it arrives.
+
+    Pages are paced by the shared adaptive rate limiter; throttled pages are retried.
+    With checkpoint=True every completed page is written to disk, so a fetch that
+    crashed or raised part-way resumes from its last good page on the next run
+    (the checkpointed pages are yielded first, and paging continues with the
+    params the checkpoint was started with, so offsets stay valid; any part of
+    the requested time window outside them is walked afterwards).
+
+    Args:
+        api_key (str): Bearer token.
+        org_phone (str, optional): Org phone for the x-phone header.
+        endpoint (str): API endpoint relative to BASE_URL (e.g. 'chats').
+        result_keys (tuple): Response keys to look for the page records in, in order.
+        limit (int): Page size (default=1000).
+        params (dict, optional): Extra query params sent with every page (e.g. start_time).
+        sleep_time (float): Optional extra fixed delay between pages in seconds.
+        stop_on_short_page (bool): Stop once a page returns fewer than `limit` records.
+        limiter (AdaptiveRateLimiter, optional): Defaults to the process-wide ratelimit.LIMITER.
+        checkpoint (bool): Checkpoint pages under cache/checkpoints (default=True).
+        checkpoint_key (dict, optional): Params the checkpoint folder is keyed on
+            instead of `params` (e.g. a time shard's aligned bounds).
+        finished (list, optional): Collects the checkpoint folder of a walk that
+            reached the end instead of clearing it; the caller clears it
+            (checkpoint.clear_checkpoint) once the records are stored.
+
+    Yields:
+        list: Raw records of one page.
+
+    Raises:
+        requests.HTTPError: On a non-200 page that get_page does not retry (e.g. 400/401);
+            the pages before it stay checkpointed for the next run.
+    """
+    url = f"{BASE_URL}/{endpoint}"
+    headers = {"Authorization": f"Bearer {api_key}"}
+    if org_phone:
+        headers["x-phone"] = org_phone
+    label = org_phone or endpoint
+
+    key = params if checkpoint_key is None else checkpoint_key
+    folder = checkpoint_dir(endpoint, org_phone, key, limit) if checkpoint else None
+    offset = 0
+    total = 0
+    gaps = []
+    done = False
+    if folder:
+        for page_offset, records in iter_checkpoint(folder, limit):
+            offset = page_offset + limit
+            total += len(records)
+            yield records
+        if offset:
+            saved = load_params(folder)
+            if saved is not None:
+                gaps, params = uncovered(saved, params or {}), saved
+            done = is_done(folder)
+            print(f"↩️ [{label}] Resumed from offset {offset} ({total} checkpointed)")
+        else:
+            save_params(folder, params)
+
+    while not done:
+        page_params = {"offset": offset, "limit": limit}
+        if params:
+            page_params.update(params)
+
+        with span("fetch.page", endpoint=endpoint, org=label, offset=offset) as sp:
+            response = get_page(url, headers, page_params, limiter=limiter, label=label)
+            sp.set(status=response.status_code, bytes=len(response.content),
+                   latency_ms=round(response.elapsed.total_seconds() * 1000, 1))
+
+            if response.status_code != 200:
+                # Stopping quietly would let the caller store the newest pages
+                # only and move its watermark past the ones never fetched
+                print(f"❌ Error for {label}: {response.status_code} {response.text}")
+                raise requests.HTTPError(
+                    f"{response.status_code} for {endpoint} at offset {offset} ({label})", response=response
+                )
+
+            data = response.json()
+            results = next((data.get(k) for k in result_keys if data.get(k)), None)
+            del data
+            sp.set(records=len(results or ()))
+
+        if not results:
+            print(f"✅ No more data for {label}, stopping.")
+            done = True
+            break
+
+        if folder:
+            save_page(folder, offset, results)
+        total += len(results)
+        print(f"[{label}] Fetched {len(results)} (total: {total})")
+        yield results
+
+        if stop_on_short_page and len(results) < limit:
+            done = True
+            break
+
+        offset += limit
+        if sleep_time:
+            time.sleep(sleep_time)
+
+    for gap in gaps:
+        print(f"[{label}] Fetching {gap.get('start_time')} - {gap.get('end_time')} outside the resumed window")
+        yield from iter_pages(api_key, org_phone, endpoint, result_keys, limit, gap, sleep_time,
+                              stop_on_short_page, limiter, checkpoint=False)
+
+    if folder and done:
+        if finished is None:
+            clear_checkpoint(folder)
+        else:
+            mark_done(folder)
+            finished.append(folder)
+
+
+def uncovered(saved, params):
+    """
+    Params of the parts of the requested start_time/end_time window outside
+    the window a resumed checkpoint was started with (saved).
+
+    A checkpoint keyed on aligned shard bounds may have been started with an
+    older "now" as end_time (or a later since as start_time).
+    """
+    gaps = []
+    start, end = params.get("start_time"), params.get("end_time")
+    saved_start, saved_end = saved.get("start_time"), saved.get("end_time")
+    if saved_end and (end is None or end > saved_end):
+        gaps.append({**params, "start_time": saved_end})
+    if saved_start and (start is None or start < saved_start):
+        gaps.append({**params, "end_time": saved_start})
+    return gaps
+
+
+def shard_bounds(window, shard="day"):
+    """
+    A time shard's window widened to whole UTC days/hours, as (start_time, end_time).
+
+    Only the first and last shard of a window (see time_shards) change: their
+    outer edge is the sliding since / now, to the second.
+    """
+    step = SHARD_SIZES[shard]
+    start = datetime.strptime(window[0], TIME_FORMAT).replace(tzinfo=timezone.utc)
+    end = datetime.strptime(window[1], TIME_FORMAT).replace(tzinfo=timezone.utc)
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    start = epoch + (start - epoch) // step * step
+    end = epoch + -((epoch - end) // step) * step
+    return start.strftime(TIME_FORMAT), end.strftime(TIME_FORMAT)
+
+
+def time_shards(start_time, end_time, shard="day"):
+    """
+    Split a [start_time, end_time] window into consecutive day or hour windows.
+
+    Inner boundaries fall on whole UTC days/hours, so reruns over a sliding window
+    reuse the same shards (and their page checkpoints).
+
+    Args:
+        start_time (str): Window start (e.g. "2025-04-25T00:00:00Z").
+        end_time (str): Window end (e.g. "2025-04-30T23:59:59Z").
+        shard (str): 'day' or 'hour' (default='day').
+
+    Returns:
+        list: (start_time, end_time) string tuples covering the window.
+    """
+    step = SHARD_SIZES[shard]
+    start = datetime.strptime(start_time, TIME_FORMAT).replace(tzinfo=timezone.utc)
+    end = datetime.strptime(end_time, TIME_FORMAT).replace(tzinfo=timezone.utc)
+
+    if shard == "day":
+        boundary = start.replace(hour=0, minute=0, second=0)
+    else:
+        boundary = start.replace(minute=0, second=0)
+
+    shards = []
+    while start < end:
+        boundary += step
+        shard_end = min(boundary, end)
+        shards.append((start.strftime(TIME_FORMAT), shard_end.strftime(TIME_FORMAT)))
+        start = shard_end
+    return shards
@@ -0,0 +1,149 @@
+import pandas as pd
+import concurrent.futures
+from fetcher import iter_pages, time_shards, shard_bounds
+from schema import ENTITIES, normalize, ingest_columns
+from perf import span
+
+
+def page_batches(pages, entity, org_phone=None, transform=None, seen=None):
+    """
+    Turn a stream of raw pages into compact typed DataFrame batches.
+
+    Each page is converted (and its raw dicts dropped) as soon as it arrives;
+    only the entity's projected fields (schema.ingest_columns) are read.
+    Records whose primary key was already seen are skipped, since offset paging
+    over data that changes during the fetch returns duplicates.
+
+    Args:
+        pages (iterable): Lists of raw records, e.g. from fetcher.iter_pages.
+        entity (str): One of schema.ENTITIES.
+        org_phone (str, optional): Tag every record with this org phone.
+        transform (callable, optional): Applied to each page's raw records first.
+        seen (set, optional): Primary keys already ingested (updated in place).
+
+    Yields:
+        pd.DataFrame: One normalized batch per non-empty page.
+    """
+    id_field = ENTITIES[entity]["id_field"]
+    columns = ingest_columns(entity)
+    seen = set() if seen is None else seen
+
+    for records in pages:
+        if transform is not None:
+            records = transform(records)
+        batch = pd.DataFrame(records, columns=columns)
+        del records
+        if batch.empty:
+            continue
+        if org_phone:
+            batch["org_phone"] = org_phone
+
+        if id_field in batch.columns:
+            keys = batch[id_field]
+            fresh = ~(keys.duplicated() | keys.isin(seen)) | keys.isna()
+            if not fresh.all():
+                batch = batch[fresh]
+            seen.update(keys[fresh].dropna())
+
+        yield normalize(batch.reset_index(drop=True), entity)
+
+
+def collect(batches):
+    """Concatenate typed batches into one DataFrame (empty if there are none)."""
+    batches = list(batches)
+    return pd.concat(batches, ignore_index=True) if batches else pd.DataFrame()
+
+
+def fetch_entity(
+    api_key,
+    org_phone=None,
+    entity="chats",
+    endpoint=None,
+    result_keys=("results",),
+    params=None,
+    transform=None,
+    tag_org=True,
+    shard=None,
+    start_time=None,
+    end_time=None,
+    max_workers=5,
+    **page_kwargs,
+):
+    """
+    Stream every page of one entity for one org phone into a typed DataFrame.
+
+    With `shard` set, the [start_time, end_time] window is split into day/hour
+    windows (see fetcher.time_shards) that are paginated in parallel and merged,
+    deduplicated on the entity's primary key.
+
+    Args:
+        api_key (str): Bearer token.
+        org_phone (str, optional): Org phone for the x-phone header.
+        entity (str): One of schema.ENTITIES.
+        endpoint (str, optional): API endpoint; defaults to the entity's endpoint.
+        result_keys (tuple): Response keys holding the page records.
+        params (dict, optional): Extra query params sent with every page.
+        transform (callable, optional): Applied to each page's raw records first.
+        tag_org (bool): Add an org_phone column with `org_phone` (default=True).
+        shard (str, optional): 'day' or 'hour' to fetch the window as parallel shards.
+        start_time (str, optional): Window start, sent as start_time.
+        end_time (str, optional): Window end, sent as end_time.
+        max_workers (int): Number of shards fetched in parallel (default=5).
+        **page_kwargs: Passed through to fetcher.iter_pages (limit, sleep_time, ...).
+
+    Returns:
+        pd.DataFrame: Normalized, deduplicated records.
+    """
+    endpoint = endpoint or ENTITIES[entity]["endpoint"]
+    tag = org_phone if tag_org else None
+
+    def fetch_window(window, sharded=False):
+        window_params = dict(params or {})
+        if window[0]:
+            window_params["start_time"] = window[0]
+        if window[1]:
+            window_params["end_time"] = window[1]
+        key = None
+        if sharded:
+            key = dict(window_params)
+            key["start_time"], key["end_time"] = shard_bounds(window, shard)
+        pages = iter_pages(api_key, org_phone, endpoint=endpoint, result_keys=result_keys,
+                           params=window_params, checkpoint_key=key, **page_kwargs)
+        return collect(page_batches(pages, entity, tag, transform))
+
+    with span("fetch.org", entity=entity, org=org_phone, shard=shard) as sp:
+        if not (shard and start_time and end_time):
+            df = fetch_window((start_time, end_time))
+        else:
+            shards = time_shards(start_time, end_time, shard)
+            print(f"[{org_phone or endpoint}] Fetching {len(shards)} {shard} shards with {max_workers} workers")
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                df = collect(f for f in executor.map(lambda w: fetch_window(w, sharded=True), shards)
+                             if not f.empty)
+
+            # Shard boundaries are inclusive on both sides
+            id_field = ENTITIES[entity]["id_field"]
+            if id_field in df.columns:
+                df = df[~df[id_field].duplicated() | df[id_field].isna()].reset_index(drop=True)
+        sp.output(df)
+    return df
+
+
+def fetch_entity_orgs(api_key, org_phones, entity, max_workers=5, **kwargs):
+    """
+    Run fetch_entity for several org phones in parallel.
+
+    Args:
+        api_key (str): Bearer token.
+        org_phones (list): List of org phones.
+        entity (str): One of schema.ENTITIES.
+        max_workers (int): Number of parallel threads (default=5).
+        **kwargs: Passed through to fetch_entity.
+
+    Returns:
+        pd.DataFrame: Combined records of all org phones, each with an org_phone column.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        frames = executor.map(lambda p: fetch_entity(api_key, p, entity, **kwargs), org_phones)
+        return collect(f for f in frames if not f.empty)
@@ -0,0 +1,151 @@
+import pandas as pd
+import io
+import json
+import os
+import time
+import hashlib
+import threading
+import requests
+from fetcher import get_session
+
+
+# Published Google Sheet with the State / District / Block / Group type of each chat
+MAPPING_URL = 'https://docs.google.com/spreadsheets/d/e/2PACX-1vSz3h-NZludfp1amcsvUogHytljEpvKTXRI138UVu0y1EpJAx67gpWBHhHU_M1ACdoI8dNc-11cm0mk/pub?gid=0&single=true&output=csv'
+
+# Last good copy of the sheet (mapping.csv) and its fetch metadata (meta.json)
+MAPPING_DIR = os.path.join("cache", "mapping")
+
+# The local copy is used as is for this long before the sheet is checked again
+MAPPING_TTL = 3600
+
+REQUIRED_COLUMNS = ["chat_id", "Group type"]
+
+_lock = threading.Lock()
+_lookups = {}
+
+
+def _paths():
+    return os.path.join(MAPPING_DIR, "mapping.csv"), os.path.join(MAPPING_DIR, "meta.json")
+
+
+def _load_meta():
+    _, meta_path = _paths()
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def _save(path, data, mode="w"):
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, mode) as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def refresh_mapping(url=None, ttl=MAPPING_TTL, force=False, timeout=30):
+    """
+    Make sure the local copy of the mapping sheet is fresh enough.
+
+    Within `ttl` of the last check nothing is fetched. After that the sheet is
+    requested conditionally (ETag / Last-Modified), so an unchanged sheet costs
+    a 304. A download replaces the local copy only if it parses and has the
+    required columns. If the sheet cannot be reached the last good copy is
+    kept (and rechecked after another `ttl`).
+
+    Args:
+        url (str, optional): CSV export URL of the sheet (default=MAPPING_URL).
+        ttl (int): Seconds a checked copy is trusted (default=MAPPING_TTL).
+        force (bool): Check the sheet even within the TTL.
+        timeout (int): Request timeout in seconds.
+
+    Returns:
+        dict: Metadata of the local copy ({"version", "etag", "last_modified", "checked_at"}).
+
+    Raises:
+        RuntimeError: The sheet is unreachable and there is no local copy yet.
+    """
+    url = url or MAPPING_URL
+    with _lock:
+        csv_path, meta_path = _paths()
+        meta = _load_meta() if os.path.exists(csv_path) else None
+        if meta and not force and time.time() - meta["checked_at"] < ttl:
+            return meta
+
+        headers = {}
+        if meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            response = get_session().get(url, headers=headers, timeout=timeout)
+            if response.status_code == 304:
+                status = "not modified"
+            else:
+                response.raise_for_status()
+                content = response.content
+                df = pd.read_csv(io.BytesIO(content))
+                missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+                if missing:
+                    raise ValueError(f"missing columns {missing}")
+
+                os.makedirs(MAPPING_DIR, exist_ok=True)
+                _save(csv_path, content, mode="wb")
+                meta = {
+                    "version": hashlib.sha1(content).hexdigest()[:12],
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+                status = f"{len(df)} rows, version {meta['version']}"
+        except (requests.RequestException, ValueError, pd.errors.ParserError) as e:
+            if not meta:
+                raise RuntimeError(f"Mapping sheet unavailable and no local copy: {e}") from e
+            status = f"⚠️ {e.__class__.__name__}, using last good copy {meta['version']}"
+
+        meta["checked_at"] = time.time()
+        _save(meta_path, json.dumps(meta))
+        print(f"[mapping] {status}")
+        return meta
+
+
+def load_mapping(**kwargs):
+    """
+    Read the mapping sheet from its local copy, refreshing it first if due.
+
+    Args:
+        **kwargs: Passed through to refresh_mapping.
+
+    Returns:
+        pd.DataFrame: The sheet as published.
+    """
+    refresh_mapping(**kwargs)
+    csv_path, _ = _paths()
+    return pd.read_csv(csv_path)
+
+
+def chat_lookup(version=None):
+    """
+    chat_id -> metadata table of the current local copy, built once per version.
+
+    Chats marked 'Not_Imp' are left out, only the first row of a repeated
+    chat_id is kept and the sheet's chat_name becomes chats_name.
+
+    Args:
+        version (str, optional): Version from refresh_mapping (defaults to the stored one).
+
+    Returns:
+        pd.DataFrame: Mapping metadata indexed by chat_id (shared, do not modify).
+    """
+    version = version or refresh_mapping()["version"]
+    if version not in _lookups:
+        df_mapp = pd.read_csv(_paths()[0])
+        df_mapp = df_mapp[df_mapp['Group type'] != 'Not_Imp']
+        lookup = (
+            df_mapp.drop_duplicates(subset=['chat_id'])
+            .rename(columns={'chat_name': 'chats_name'})
+            .set_index('chat_id')
+        )
+        _lookups.clear()
+        _lookups[version] = lookup
+    return _lookups[version]
@@ -1,11 +1,48 @@
-import requests
 import pandas as pd
 from datetime import datetime, timedelta
 import streamlit as st
+from ingest import fetch_entity
+from sync import sync_org
+from store import write_entity
+from checkpoint import clear_checkpoint
+
+
+def flatten_messages(records):
+    """
+    Expand chat-level records with a nested "messages" list into one flat record per message.
+
+    Works on the raw page dicts in a single pass (parent fields first, message
+    fields win), so the DataFrame is built once from flat records instead of
+    explode + apply(pd.Series) creating a Series per message.
+
+    Args:
+        records (list): Raw API records, with or without a nested "messages" list.
+
+    Returns:
+        list: Flat message records.
+    """
+    flat = []
+    for r in records:
+        msgs = r.get("messages")
+        if isinstance(msgs, list):
+            parent = {k: v for k, v in r.items() if k != "messages"}
+            flat.extend({**parent, **m} for m in msgs if isinstance(m, dict))
+        else:
+            flat.append(r)
+    return flat
 
 
 @st.cache_data(ttl=7200)
-def fetch_all_message_data(api_key, org_phone=None, endpoint="chats/messages", limit=1000):
+def fetch_all_message_data(
+    api_key,
+    org_phone=None,
+    endpoint="chats/messages",
+    limit=1000,
+    incremental=True,
+    shard="day",
+    max_workers=5,
+    load=True,
+):
     """
     Fetch messages from Periskope API within the last 30 days using API-side filtering.
 
@@ -14,60 +51,55 @@ def fetch_all_message_data(api_key, org_phone=None, endpoint="chats/messages", l
         org_phone (str, optional): Org phone number for x-phone header (if required).
         endpoint (str): API endpoint (default 'chats/messages').
         limit (int): Page size (default=1000).
+        incremental (bool): Only fetch messages newer than the stored watermark and
+            merge them into the local store (default=True).
+        shard (str): Split the time window into 'day' or 'hour' shards fetched in
+            parallel (default='day'); None walks the window on a single thread.
+        max_workers (int): Number of shards fetched in parallel (default=5).
+        load (bool): Return the messages; False only updates the local store
+            (cache/store/messages) and returns an empty DataFrame.
 
     Returns:
         pd.DataFrame: DataFrame of messages filtered for last 30 days.
     """
 
-    url = f"https://api.periskope.app/v1/{endpoint}"
-    headers = {"Authorization": f"Bearer {api_key}"}
-    if org_phone:
-        headers["x-phone"] = org_phone
-
     # Calculate start and end times
     end_time = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
     start_time = (datetime.utcnow() - timedelta(days=30)).strftime("%Y-%m-%dT%H:%M:%SZ")
 
-    all_results = []
-    offset = 0
-
-    while True:
-        params = {
-            "offset": offset,
-            "limit": limit,
-            "start_time": start_time,
-            "end_time": end_time,
-        }
-
-        resp = requests.get(url, headers=headers, params=params)
-        if resp.status_code != 200:
-            print(f"❌ Error {resp.status_code}: {resp.text}")
-            break
-
-        data = resp.json()
-        results = data.get("messages") or data.get("results") or data.get("data")
-
-        if not results:
-            break
-
-        all_results.extend(results)
-        offset += limit
-
-        # If fewer than limit results are returned, stop
-        if len(results) < limit:
-            break
-
-    if not all_results:
+    fetch_kwargs = dict(
+        endpoint=endpoint,
+        result_keys=("messages", "results", "data"),
+        limit=limit,
+        stop_on_short_page=True,
+    )
+
+    if incremental:
+        df = sync_org(api_key, org_phone, since=start_time, shard=shard, max_workers=max_workers,
+                      transform=flatten_messages, load=load, **fetch_kwargs)
+    else:
+        # Pages are flattened and converted to typed batches as they arrive
+        finished = []
+        df = fetch_entity(
+            api_key,
+            org_phone,
+            "messages",
+            transform=flatten_messages,
+            tag_org=False,
+            shard=shard,
+            start_time=start_time,
+            end_time=end_time,
+            max_workers=max_workers,
+            finished=finished,
+            **fetch_kwargs,
+        )
+        write_entity("messages", df, normalized=True)
+        for folder in finished:
+            clear_checkpoint(folder)
+
+    if df.empty or not load:
         return pd.DataFrame()
 
-    # Convert to DataFrame
-    df = pd.DataFrame(all_results)
-
-    # Handle nested "messages" if present
-    if "messages" in df.columns:
-        df = df.explode("messages", ignore_index=True)
-        df = pd.concat([df.drop(columns="messages"), df["messages"].apply(pd.Series)], axis=1)
-
     # Ensure timestamp is parsed
     if "timestamp" in df.columns:
         df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
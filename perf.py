@@ -0,0 +1,255 @@
+import pandas as pd
+import functools
+import inspect
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+# Lightweight timing spans. Every span records its wall time, the rows and
+# (shallow) DataFrame memory going in and out, and the change in process RSS.
+# Finished spans are kept in memory for the dashboard's admin panel and
+# appended to a JSON lines log.
+PERF_DIR = os.path.join("cache", "perf")
+PERF_LOG = os.path.join(PERF_DIR, "spans.jsonl")
+
+# The log is rotated to spans.jsonl.1 beyond this size (bytes)
+PERF_LOG_MAX = 20 * 1024 * 1024
+
+# Finished spans kept in memory
+KEEP_SPANS = 5000
+
+# PERISKOPE_PERF=0 turns spans into no-ops
+ENABLED = os.environ.get("PERISKOPE_PERF", "1") != "0"
+
+_spans = deque(maxlen=KEEP_SPANS)
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_local = threading.local()
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def start_run():
+    """
+    Start a new run on the calling thread (e.g. one dashboard script run).
+
+    Spans finished on this thread from now on carry the returned id as "run",
+    so concurrent sessions can tell their own spans apart (see recent).
+    Spans of worker threads (fetch shards) carry no run.
+    """
+    _local.run = next(_ids)
+    return _local.run
+
+
+def _rss():
+    """Resident set size of this process in bytes (None where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _frames(values):
+    """DataFrames among values, looking one level into lists, tuples and dicts."""
+    for value in values:
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            yield value
+        elif isinstance(value, (list, tuple)):
+            yield from (v for v in value if isinstance(v, (pd.DataFrame, pd.Series)))
+        elif isinstance(value, dict):
+            yield from (v for v in value.values() if isinstance(v, (pd.DataFrame, pd.Series)))
+
+
+def _measure(values):
+    rows = mem = 0
+    found = False
+    for df in _frames(values):
+        found = True
+        rows += len(df)
+        usage = df.memory_usage(index=True, deep=False)
+        mem += int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    return (rows, mem) if found else (None, None)
+
+
+class Span:
+    """One timed stage; see span()."""
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.rows_in = self.rows_out = None
+        self.mem_in = self.mem_out = None
+
+    def set(self, **attrs):
+        """Attach extra attributes (records, bytes, status, ...)."""
+        self.attrs.update(attrs)
+        return self
+
+    def input(self, *values):
+        """Count the rows/memory of the DataFrames going in."""
+        self.rows_in, self.mem_in = _measure(values)
+        return self
+
+    def output(self, *values):
+        """Count the rows/memory of the DataFrames coming out."""
+        self.rows_out, self.mem_out = _measure(values)
+        return self
+
+
+class span:
+    """
+    Time a block as a named span (nested spans record their parent).
+
+        with span("fetch.page", endpoint="chats", org=org_phone) as sp:
+            ...
+            sp.set(records=len(results))
+
+    Args:
+        name (str): Stage name, dotted by area (fetch.*, pipeline.*, slides.*, charts.*).
+        **attrs: Attributes stored with the span.
+    """
+
+    def __init__(self, name, **attrs):
+        self.span = Span(name, attrs)
+
+    def __enter__(self):
+        if not ENABLED:
+            return self.span
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.id = next(_ids)
+        self.parent = stack[-1] if stack else None
+        self.trace = _local.trace if stack else self.id
+        if not stack:
+            _local.trace = self.id
+        stack.append(self.id)
+        self.rss = _rss()
+        self.started = time.time()
+        self.clock = time.perf_counter()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if not ENABLED:
+            return False
+        wall = time.perf_counter() - self.clock
+        _local.stack.pop()
+        rss = _rss()
+        sp = self.span
+        mem_delta = sp.mem_out - sp.mem_in if sp.mem_in is not None and sp.mem_out is not None else None
+        record = {
+            "ts": round(self.started, 3),
+            "name": sp.name,
+            "wall_ms": round(wall * 1000, 2),
+            "rows_in": sp.rows_in,
+            "rows_out": sp.rows_out,
+            "mem_in_mb": _mb(sp.mem_in),
+            "mem_out_mb": _mb(sp.mem_out),
+            "mem_delta_mb": _mb(mem_delta),
+            "rss_delta_mb": _mb(rss - self.rss) if rss is not None and self.rss is not None else None,
+            "id": self.id,
+            "parent": self.parent,
+            "trace": self.trace,
+            "run": getattr(_local, "run", None),
+            "thread": threading.current_thread().name,
+            **sp.attrs,
+        }
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        _record(record)
+        return False
+
+
+def _mb(value):
+    return round(value / 2**20, 3) if value is not None else None
+
+
+def _record(record):
+    line = json.dumps(record, default=str, ensure_ascii=False)
+    with _lock:
+        _spans.append(record)
+        try:
+            os.makedirs(PERF_DIR, exist_ok=True)
+            if os.path.exists(PERF_LOG) and os.path.getsize(PERF_LOG) > PERF_LOG_MAX:
+                os.replace(PERF_LOG, PERF_LOG + ".1")
+            with open(PERF_LOG, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError:
+            pass  # telemetry never breaks the app
+
+
+def traced(name=None, attrs=()):
+    """
+    Decorator running a function inside a span.
+
+    DataFrames among the arguments (and inside list/tuple/dict arguments) count
+    as input, those of the return value as output.
+
+    Args:
+        name (str, optional): Span name (default: module.function).
+        attrs (tuple): Names of parameters whose values are stored with the span.
+    """
+    def decorate(func):
+        label = name or f"{func.__module__}.{func.__name__}"
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            bound = signature.bind_partial(*args, **kwargs).arguments if attrs else {}
+            with span(label, **{a: bound.get(a) for a in attrs}) as sp:
+                sp.input(*args, *kwargs.values())
+                result = func(*args, **kwargs)
+                sp.output(*result) if isinstance(result, tuple) else sp.output(result)
+                return result
+        return wrapper
+    return decorate
+
+
+def recent(since=None, run=None, limit=None):
+    """
+    Finished spans kept in memory, oldest first.
+
+    Args:
+        since (float, optional): Only spans started at or after this epoch time.
+        run (int, optional): Only spans of this run (see start_run).
+        limit (int, optional): Only the last `limit` spans.
+
+    Returns:
+        list: Span records (dicts, as written to PERF_LOG).
+    """
+    with _lock:
+        spans = list(_spans)
+    if since is not None:
+        spans = [s for s in spans if s["ts"] >= since]
+    if run is not None:
+        spans = [s for s in spans if s["run"] == run]
+    return spans[-limit:] if limit else spans
+
+
+def summary(spans):
+    """
+    Spans aggregated by name, slowest total first.
+
+    Returns:
+        pd.DataFrame: name, count, total/max wall_ms, rows_out and mem_delta_mb sums.
+    """
+    df = pd.DataFrame(spans)
+    if df.empty:
+        return df
+    for col in ("rows_out", "mem_delta_mb"):
+        if col not in df.columns:
+            df[col] = None
+    total = lambda s: s.sum(min_count=1)
+    return (
+        df.groupby("name")
+        .agg(count=("wall_ms", "size"), total_ms=("wall_ms", "sum"), max_ms=("wall_ms", "max"),
+             rows_out=("rows_out", total), mem_delta_mb=("mem_delta_mb", total))
+        .sort_values("total_ms", ascending=False)
+        .reset_index()
+    )
@@ -0,0 +1,212 @@
+import pandas as pd
+import numpy as np
+from perf import traced
+
+
+# Days are bucketed in India time, whatever the server's timezone
+TIMEZONE = "Asia/Kolkata"
+
+# Day number given to rows without a timestamp; sorts last, never in a range
+NO_DAY = np.iinfo(np.int32).max
+
+
+# ----------- Normalize message type ---------------------------------
+TYPE_MAP = {
+    "text": "Text", "conversation": "Text", "chat": "Text",
+    "image": "Image", "video": "Video", "audio": "Audio"
+}
+
+# Groups dropped from every slide
+EXCLUDED_GROUPS = ["Cotton' 97 Arts Batch", "DRUG-FREE MIZORAM"]
+
+# Chat metadata copied onto every message
+META_COLS = ['chat_id', 'chats_name', 'District Name', 'State Name', 'Block']
+
+# Repeated string columns stored as categoricals; each column shares one
+# category dictionary across all frames, so merges and groupbys run on codes
+CATEGORICAL_COLS = [
+    'chat_id', 'org_phone', 'sender_phone', 'chats_name', 'District Name', 'State Name',
+    'Block', 'Group type', 'chat_type', 'message_type', 'reaction', 'type',
+]
+
+
+def local_today():
+    """Current date in TIMEZONE."""
+    return pd.Timestamp.now(tz=TIMEZONE).date()
+
+
+def day_number(date):
+    """Days since 1970-01-01 of a date (or anything np.datetime64 accepts)."""
+    return int(np.datetime64(date, "D").astype(np.int64))
+
+
+@traced()
+def add_day_columns(df, ts_col="timestamp"):
+    """
+    Parse `ts_col` and bucket it into local (IST) days, once.
+
+    Adds date_new (tz-naive datetime64 midnight of the local day), hour (local)
+    and day (int32 day number, NO_DAY for missing timestamps), and sorts the
+    frame by day so date ranges can be cut with date_slice.
+    """
+    ts = pd.to_datetime(df[ts_col], errors="coerce", utc=True)
+    local = ts.dt.tz_convert(TIMEZONE).dt.tz_localize(None)
+    df[ts_col] = ts
+    df['date_new'] = local.dt.floor("D")
+    df['hour'] = local.dt.hour
+    days = df['date_new'].to_numpy(dtype="datetime64[D]")
+    df['day'] = np.where(np.isnat(days), NO_DAY, days.astype(np.int64)).astype(np.int32)
+    return df.sort_values('day', kind="stable", ignore_index=True)
+
+
+def date_slice(df, start_date, end_date):
+    """
+    Rows of a day-sorted frame (see add_day_columns) between two dates, inclusive.
+
+    Binary-searches the day column and returns a positional slice, no row mask.
+    """
+    lo = df['day'].searchsorted(day_number(start_date), side="left")
+    hi = df['day'].searchsorted(day_number(end_date), side="right")
+    return df.iloc[lo:hi]
+
+
+@traced()
+def build_chat_df(chats_df, lookup):
+    """
+    Merge the group chats with the Google Sheet mapping (State / District / Block / Group type).
+
+    Args:
+        chats_df (pd.DataFrame): Chats from the local store.
+        lookup (pd.DataFrame): Sheet metadata indexed by chat_id (see mapping.chat_lookup).
+
+    Returns:
+        pd.DataFrame: One row per mapped group chat, with chat_created_at and its day columns.
+    """
+    chats_df = chats_df[chats_df['chat_type'] == 'group']
+
+    # Fix accidental leading column
+    if ' chat_name' in chats_df.columns:
+        chats_df = chats_df.rename(columns={' chat_name': 'chat_name'})
+
+    # Merge metadata (mapped chats only)
+    chat_df_new = chats_df.drop_duplicates(subset=['chat_id'])
+    merged_df = chat_df_new.join(lookup, on='chat_id', how='inner', rsuffix='_sheet')
+    merged_df = merged_df.dropna(subset=['Group type'])
+    # Drop unwanted groups
+    merged_df = merged_df[~merged_df['chats_name'].isin(EXCLUDED_GROUPS)]
+
+    chat_df = merged_df.copy()
+    chat_df['chat_created_at'] = chat_df['created_at']
+    return add_day_columns(chat_df, 'chat_created_at')
+
+
+def _is_text(series):
+    return pd.api.types.infer_dtype(series, skipna=True) in ("string", "categorical", "empty")
+
+
+@traced()
+def compact(frames, columns=CATEGORICAL_COLS):
+    """
+    Convert repeated string columns to categoricals with shared categories.
+
+    Every column gets one sorted category dictionary built from its values in
+    all `frames`, so equal values have equal codes across frames.
+
+    Args:
+        frames (list): DataFrames to convert (modified in place).
+        columns (list): Columns to convert where present.
+
+    Returns:
+        list: The same frames.
+    """
+    for col in columns:
+        having = [df for df in frames if col in df.columns]
+        # Non-text metadata (e.g. a numeric Block sheet column) is left alone
+        if not having or not all(_is_text(df[col]) for df in having):
+            continue
+        values = pd.concat([df[col].dropna() for df in having], ignore_index=True)
+        dtype = pd.CategoricalDtype(pd.Index(values.unique()).sort_values())
+        for df in having:
+            df[col] = df[col].astype(dtype)
+    return frames
+
+
+@traced()
+def normalize_messages(msg_df):
+    """Strip '@c.us' from sender phones and map raw message types onto TYPE_MAP (else 'Other')."""
+    msg_df['sender_phone'] = msg_df['sender_phone'].str.replace('@c.us', '')
+    msg_df['message_type'] = msg_df.get('message_type', 'Other').map(TYPE_MAP).fillna("Other")
+    return msg_df
+
+
+@traced()
+def restrict_to_groups(df, group_ids):
+    """Rows of an activity frame that belong to the given (mapped group) chats."""
+    return df[df['chat_id'].isin(group_ids)].reset_index(drop=True)
+
+
+@traced()
+def attach_chat_meta(msg_df, chat_df):
+    """Copy the chat metadata (META_COLS) of chat_df onto every message."""
+    available_cols = [c for c in META_COLS if c in chat_df.columns]
+    return msg_df.merge(chat_df[available_cols], on='chat_id', how='left')
+
+
+def _to_date(day):
+    return np.datetime64(int(day), "D").astype(object)
+
+
+@traced()
+def preprocess(chats_df, msg_df, rec_df, noti_df, lookup):
+    """
+    Run every widget-independent preprocessing step once.
+
+    Parses timestamps and buckets them into IST days (frames come back sorted
+    by day), normalizes message types, attaches chat metadata to the
+    messages and restricts all activity to the mapped group chats. Repeated
+    strings are then compacted into shared categoricals (see compact). The result
+    only depends on the fetched data, so the dashboard builds the cubes from
+    it once per data version (see cubes.build_cubes).
+
+    Args:
+        chats_df (pd.DataFrame): Chats.
+        msg_df (pd.DataFrame): Messages.
+        rec_df (pd.DataFrame): Reactions.
+        noti_df (pd.DataFrame): Notifications.
+        lookup (pd.DataFrame): Google Sheet metadata by chat_id (see mapping.chat_lookup).
+
+    Returns:
+        dict: chat_df, msg_df, rec_df, noti_df ready to filter, plus the
+            min_date/max_date bounds.
+    """
+    chat_df = build_chat_df(chats_df, lookup)
+
+    msg_df = normalize_messages(add_day_columns(msg_df.copy()))
+
+    rec_df = add_day_columns(rec_df.copy())
+    rec_df['reaction'] = rec_df['reaction'].fillna("None")
+    noti_df = add_day_columns(noti_df.copy())
+
+    # Sidebar date bounds (all stored activity, before the group restriction)
+    all_days = np.concatenate([chat_df['day'], msg_df['day'], noti_df['day']])
+    all_days = all_days[(all_days > day_number("2000-01-01")) & (all_days != NO_DAY)]
+
+    # Restrict to group chats
+    group_ids = chat_df['chat_id'].unique().tolist()
+    msg_df = restrict_to_groups(msg_df, group_ids)
+    rec_df = restrict_to_groups(rec_df, group_ids)
+    noti_df = restrict_to_groups(noti_df, group_ids)
+
+    compact([chat_df, msg_df, rec_df, noti_df])
+
+    # Add metadata to message df
+    msg_df = attach_chat_meta(msg_df, chat_df)
+
+    return {
+        "chat_df": chat_df,
+        "msg_df": msg_df,
+        "rec_df": rec_df,
+        "noti_df": noti_df,
+        "min_date": _to_date(all_days.min()),
+        "max_date": _to_date(all_days.max()),
+    }
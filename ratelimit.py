@@ -0,0 +1,96 @@
+import time
+import threading
+from email.utils import parsedate_to_datetime
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket shared by every fetch worker, with AIMD rate control.
+
+    Each page request takes one token. Fast successful responses raise the
+    rate step by step; a 429/5xx halves it and pauses all workers for the
+    server's Retry-After (or a backoff when the header is missing).
+
+    Args:
+        rate (float): Starting requests per second (default=2.0).
+        min_rate (float): Lowest rate after backoffs (default=0.5).
+        max_rate (float): Highest rate reached by speed-ups (default=20.0).
+        burst (int): Max tokens that can pile up while idle (default=5).
+        fast_latency (float): Responses quicker than this (seconds) speed the bucket up.
+        step (float): Requests per second added per fast response (default=0.25).
+    """
+
+    def __init__(self, rate=2.0, min_rate=0.5, max_rate=20.0, burst=5, fast_latency=1.0, step=0.25):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.fast_latency = fast_latency
+        self.step = step
+
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self, latency):
+        """Speed up after a fast successful response."""
+        if latency < self.fast_latency:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.step)
+
+    def on_throttle(self, retry_after=None, attempt=0):
+        """
+        Back off after a 429/5xx or connection error.
+
+        Args:
+            retry_after (float, optional): Seconds requested by the server.
+            attempt (int): Retry number of the failing page, used for exponential backoff.
+        """
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            delay = retry_after if retry_after is not None else min(60.0, 2 ** attempt)
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+            self._tokens = 0.0
+
+
+def parse_retry_after(value):
+    """
+    Convert a Retry-After header (seconds or HTTP date) to seconds.
+
+    Returns:
+        float or None: Seconds to wait, or None if the header is missing/invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# Shared by all fetchers in this process
+LIMITER = AdaptiveRateLimiter()
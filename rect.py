@@ -1,9 +1,8 @@
-import requests
 import pandas as pd
-import time
-import concurrent.futures
 import streamlit as st
-from datetime import datetime, timedelta
+from ingest import fetch_entity_orgs
+from sync import sync_orgs
+from store import write_entity
 
 
 @st.cache_data(ttl=600)
@@ -12,60 +11,29 @@ def fetch_all_rection_data(
     org_phones,
     endpoint="reactions",
     limit=1000,
-    sleep_time=0.5,
+    sleep_time=0.0,
     max_workers=5,
+    incremental=True,
+    load=True,
 ):
     """
     Fetch all paginated reaction data from Periskope API for multiple org phones in parallel.
     Only fetches data within start_date → end_date to reduce load.
+    With incremental=True only reactions newer than the stored watermark are fetched.
+    Results are merged into the local store (cache/store/reactions); load=False skips
+    reading them back and returns an empty DataFrame.
     """
+    fetch_kwargs = dict(
+        endpoint=endpoint,
+        result_keys=("reactions", "results"),
+        limit=limit,
+        sleep_time=sleep_time,
+    )
 
-    url = f"https://api.periskope.app/v1/{endpoint}"
+    if incremental:
+        return sync_orgs(api_key, org_phones, max_workers=max_workers, load=load, **fetch_kwargs)
 
-    
+    df = fetch_entity_orgs(api_key, org_phones, "reactions", max_workers=max_workers, **fetch_kwargs)
+    write_entity("reactions", df, normalized=True)
 
-    def fetch_single_org(org_phone):
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "x-phone": org_phone
-        }
-
-        offset = 0
-        all_results = []
-
-        while True:
-            params = {
-                "offset": offset,
-                "limit": limit,
-            }
-            response = requests.get(url, headers=headers, params=params)
-
-            if response.status_code != 200:
-                print(f"❌ Error for {org_phone}: {response.status_code} {response.text}")
-                break
-
-            data = response.json()
-            results = data.get("reactions") or data.get("results")
-
-            if not results:
-                print(f"✅ No more data for {org_phone}, stopping.")
-                break
-
-            all_results.extend(results)
-            print(f"[{org_phone}] Fetched {len(results)} (total: {len(all_results)})")
-
-            offset += limit
-            time.sleep(sleep_time)
-
-        for r in all_results:
-            r["org_phone"] = org_phone
-
-        return all_results
-
-    combined_results = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        results = executor.map(fetch_single_org, org_phones)
-        for res in results:
-            combined_results.extend(res)
-
-    return pd.DataFrame(combined_results)
+    return df if load else pd.DataFrame()
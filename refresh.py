@@ -0,0 +1,152 @@
+"""
+Background refresh worker: syncs Periskope into the local store and publishes
+the dashboard snapshot, so dashboard sessions never wait on the API.
+
+    python refresh.py                 # one refresh
+    python refresh.py --every 15      # refresh every 15 minutes
+    python refresh.py --no-sync       # rebuild the snapshot from the local store only
+
+The API key is read from --api-key or the PERISKOPE_API_KEY environment variable.
+PERISKOPE_CUBE_DAYS (default 90) sets the days of activity the cubes cover.
+"""
+import argparse
+import os
+import time
+import traceback
+import pandas as pd
+from datetime import timedelta
+from notif import fetch_all_notification_data
+from chats import fetch_all_chat_data
+from msg import fetch_all_message_data
+from rect import fetch_all_rection_data
+from store import read_entity, list_org_phones, data_version
+from mapping import refresh_mapping, chat_lookup
+from pipeline import preprocess, local_today
+from cubes import build_cubes
+from snapshot import publish_snapshot, latest_snapshot, snapshot_meta, build_views
+
+
+# Days of activity (messages, reactions, notifications) the cubes are built
+# from, ending today; chats are always read in full. The store keeps all
+# history, so this bounds the memory and build time of the cube path, which
+# (without a refresh worker) reruns on every store write, webhook flushes
+# included. The sidebar's date range starts at the window; the duckdb backend
+# (PERISKOPE_BACKEND=duckdb) queries the whole store. 0 reads everything.
+CUBE_DAYS = int(os.environ.get("PERISKOPE_CUBE_DAYS", 90))
+
+
+def sync_all(api_key, cached=False):
+    """
+    Pull new chats, messages, reactions and notifications into the local store.
+
+    Args:
+        api_key (str): Bearer token.
+        cached (bool): Go through the fetchers' st.cache_data (inside the
+            dashboard); the worker calls the undecorated functions (default=False).
+    """
+    def fetch(func):
+        return func if cached else func.__wrapped__
+
+    fetch(fetch_all_message_data)(api_key, load=False)
+    org_phones = pd.Series(list_org_phones("messages")).str.replace('@c.us', '').unique().tolist()
+
+    fetch(fetch_all_chat_data)(api_key, org_phones, endpoint="chats", limit=1000, load=False)
+    fetch(fetch_all_rection_data)(api_key, org_phones, endpoint="reactions", limit=1000, load=False)
+    fetch(fetch_all_notification_data)(api_key, org_phones, limit=1000, load=False)
+
+
+def current_version():
+    """(store data version, mapping version) of the data a build would use now."""
+    return (data_version(), refresh_mapping()["version"])
+
+
+def build_dashboard_data(version=None):
+    """
+    Read the store and the mapping, preprocess and build the dashboard cubes.
+
+    Only the last CUBE_DAYS days of activity are read, and the min_date bound
+    is clamped to them (chats, read in full, would reach back further).
+
+    Args:
+        version (tuple, optional): From current_version (computed if omitted).
+
+    Returns:
+        dict: Output of cubes.build_cubes.
+    """
+    _, mapping_version = version or current_version()
+    # Partitions are dated in UTC, IST runs ahead: one extra day covers the first local day
+    start = local_today() - timedelta(days=CUBE_DAYS + 1) if CUBE_DAYS else None
+    frames = preprocess(
+        read_entity("chats"),
+        read_entity("messages", start_date=start),
+        read_entity("reactions", start_date=start),
+        read_entity("notifications", start_date=start),
+        chat_lookup(mapping_version),
+    )
+    if CUBE_DAYS:
+        first_day = local_today() - timedelta(days=CUBE_DAYS)
+        frames["min_date"] = min(max(frames["min_date"], first_day), frames["max_date"])
+    return build_cubes(frames)
+
+
+def refresh(api_key, sync=True):
+    """
+    Sync everything and publish a new snapshot if the data or the mapping changed.
+
+    The snapshot holds the cubes and the prebuilt default view of every slide.
+    A snapshot is republished on a new local day as well, the weekly window moved.
+
+    Args:
+        api_key (str): Bearer token.
+        sync (bool): Pull from the API first; False only rebuilds from the local store.
+
+    Returns:
+        str: Id of the current snapshot.
+    """
+    started = time.time()
+    if sync:
+        sync_all(api_key)
+
+    version = current_version()
+    today = local_today()
+    snapshot_id = latest_snapshot()
+    if snapshot_id:
+        meta = snapshot_meta(snapshot_id)
+        if meta["version"] == list(version) and meta.get("today") == str(today):
+            print(f"✅ No changes, snapshot {snapshot_id} is current ({time.time() - started:.1f}s)")
+            return snapshot_id
+
+    cubes = build_dashboard_data(version)
+    views = build_views(cubes, today)
+    snapshot_id = publish_snapshot(cubes, version, views)
+    print(f"✅ Refresh done in {time.time() - started:.1f}s")
+    return snapshot_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync Periskope data and publish the dashboard snapshot.")
+    parser.add_argument("--api-key", default=os.environ.get("PERISKOPE_API_KEY"),
+                        help="Periskope API key (default: $PERISKOPE_API_KEY)")
+    parser.add_argument("--every", type=float, default=0,
+                        help="Refresh every N minutes; 0 runs once (default)")
+    parser.add_argument("--no-sync", action="store_true",
+                        help="Skip the API sync, only rebuild the snapshot from the local store")
+    args = parser.parse_args()
+    if not args.api_key and not args.no_sync:
+        parser.error("an API key is required (--api-key or PERISKOPE_API_KEY)")
+
+    while True:
+        try:
+            refresh(args.api_key, sync=not args.no_sync)
+        except Exception:
+            if not args.every:
+                raise
+            # Keep the schedule alive; the last snapshot stays published
+            print(f"❌ Refresh failed:\n{traceback.format_exc()}")
+        if not args.every:
+            break
+        time.sleep(args.every * 60)
+
+
+if __name__ == "__main__":
+    main()
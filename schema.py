@@ -0,0 +1,137 @@
+import pandas as pd
+
+
+# Declarative per-entity definitions shared by the fetchers and the local store.
+# Together they are the column projection applied at ingest: any other API
+# field (media metadata, member maps, ...) never reaches a DataFrame.
+#   schema:  kept scalar columns and their dtypes
+#   flatten: nested "field.subfield" -> (new column, dtype), pulled out as typed columns
+ENTITIES = {
+    "chats": {
+        "endpoint": "chats",
+        "time_field": "created_at",
+        "id_field": "chat_id",
+        "schema": {
+            "chat_id": "string",
+            "chat_name": "string",
+            "chat_type": "string",
+            "org_phone": "string",
+            "created_at": "datetime64[ns, UTC]",
+        },
+        "flatten": {
+            "latest_message.timestamp": ("last_message_at", "datetime64[ns, UTC]"),
+        },
+    },
+    "messages": {
+        "endpoint": "chats/messages",
+        "time_field": "timestamp",
+        "id_field": "message_id",
+        "schema": {
+            "message_id": "string",
+            "chat_id": "string",
+            "org_phone": "string",
+            "sender_phone": "string",
+            "message_type": "string",
+            "body": "string",
+            "timestamp": "datetime64[ns, UTC]",
+        },
+        "flatten": {},
+    },
+    "reactions": {
+        "endpoint": "reactions",
+        "time_field": "timestamp",
+        "id_field": "reaction_id",
+        "schema": {
+            "reaction_id": "string",
+            "message_id": "string",
+            "chat_id": "string",
+            "org_phone": "string",
+            # Unused by the slides, but part of FALLBACK_KEY: without it identical
+            # reactions of different senders collapse when reaction_id is missing
+            "sender_phone": "string",
+            "reaction": "string",
+            "timestamp": "datetime64[ns, UTC]",
+        },
+        "flatten": {},
+    },
+    "notifications": {
+        "endpoint": "chats/notifications",
+        "time_field": "timestamp",
+        "id_field": "notification_id",
+        "schema": {
+            "notification_id": "string",
+            "chat_id": "string",
+            "org_phone": "string",
+            "type": "string",
+            "timestamp": "datetime64[ns, UTC]",
+        },
+        "flatten": {},
+    },
+}
+
+ENDPOINT_ENTITY = {cfg["endpoint"]: name for name, cfg in ENTITIES.items()}
+
+# Fallback dedupe key when a payload has no primary key field
+FALLBACK_KEY = ["chat_id", "message_id", "sender_phone", "type", "reaction", "timestamp"]
+
+
+def _cast(series, dtype):
+    if dtype.startswith("datetime64"):
+        return pd.to_datetime(series, errors="coerce", utc=True)
+    return series.astype(dtype)
+
+
+def _is_nested(series):
+    """Tell from the first non-null value whether a column holds dicts/lists."""
+    idx = series.first_valid_index()
+    return idx is not None and isinstance(series[idx], (dict, list))
+
+
+def ingest_columns(entity):
+    """API fields read from the raw records of an entity (kept columns plus flatten sources)."""
+    cfg = ENTITIES[entity]
+    sources = [path.split(".", 1)[0] for path in cfg["flatten"]]
+    return list(dict.fromkeys([*cfg["schema"], *sources]))
+
+
+def stored_columns(entity):
+    """Columns an entity keeps after normalize."""
+    cfg = ENTITIES[entity]
+    return [*cfg["schema"], *(col for col, _ in cfg["flatten"].values())]
+
+
+def normalize(df, entity):
+    """
+    Bring a raw API frame of an entity into its projected, typed shape.
+
+    Declared subfields are pulled out of nested fields into typed columns, the
+    scalar columns are cast to their schema dtypes and every other column
+    (including the nested fields themselves) is dropped.
+
+    Args:
+        df (pd.DataFrame): Raw records of one entity.
+        entity (str): One of ENTITIES.
+
+    Returns:
+        pd.DataFrame: Normalized frame holding only the entity's stored columns.
+    """
+    cfg = ENTITIES[entity]
+
+    for path, (col, dtype) in cfg["flatten"].items():
+        field, sub = path.split(".", 1)
+        if field in df.columns and _is_nested(df[field]):
+            df[col] = _cast(df[field].str.get(sub), dtype)
+
+    for col, dtype in cfg["schema"].items():
+        if col in df.columns:
+            df[col] = _cast(df[col], dtype)
+
+    return df[[c for c in stored_columns(entity) if c in df.columns]]
+
+
+def make_parquet_safe(df):
+    """Last-resort fix for mixed-type object columns pyarrow refuses: store them as strings."""
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
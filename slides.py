@@ -0,0 +1,202 @@
+import pandas as pd
+from datetime import timedelta
+from cubes import rollup
+from perf import traced
+
+
+# Data preparation of the five dashboard slides. Every function only reads
+# the cubes (see cubes.build_cubes) and returns the small frames/values its
+# slide displays, so each slide can be computed (and cached) on its own.
+
+# Sidebar default: the last 30 days of data
+DEFAULT_DAYS = 30
+
+# Slides filtered by the weekly window ending today; the others take the sidebar range
+WEEKLY_SLIDES = ["topline", "district_activity"]
+
+# Local days in the weekly window, today included
+WEEK_DAYS = 7
+
+
+def default_range(bounds):
+    """Default sidebar (start_date, end_date) given the min_date/max_date bounds of the data."""
+    return bounds["max_date"] - timedelta(days=DEFAULT_DAYS), bounds["max_date"]
+
+
+def week_start(today):
+    """First local day of the weekly window ending on (and including) today."""
+    return today - timedelta(days=WEEK_DAYS - 1)
+
+
+def slide_args(name, today, start_date, end_date):
+    """Filter arguments the slide function `name` takes."""
+    return (today,) if name in WEEKLY_SLIDES else (start_date, end_date)
+
+
+def _truncate(text, max_len=120):
+    if isinstance(text, str) and len(text) > max_len:
+        return text[:max_len] + "..."
+    return text
+
+
+@traced()
+def topline(cubes, today):
+    """
+    Slide 1 – Topline Overview.
+
+    Args:
+        cubes (dict): Output of cubes.build_cubes.
+        today (date): Current local day; the weekly window is its last WEEK_DAYS days (see week_start).
+
+    Returns:
+        dict: total_groups, unique_individuals, total_members, active_groups and
+            the dist_grp / state_grp / type_grp group counts (type_col names the last one).
+    """
+    start = week_start(today)
+    msg_cube = cubes["messages"]
+
+    # Messages per sender / chat in the last 7 days
+    member_msg_counts = rollup(msg_cube, ["sender_phone"], start, today, name="msg_count")
+    chat_msg_counts = rollup(msg_cube, ["chat_id"], start, today, name="msg_count")
+
+    return {
+        "total_groups": cubes["total_groups"],
+        # Members who sent ≥ 1 / ≥ 7 messages
+        "unique_individuals": member_msg_counts[member_msg_counts["msg_count"] >= 1]["sender_phone"].nunique(),
+        "total_members": member_msg_counts[member_msg_counts["msg_count"] >= 7]["sender_phone"].nunique(),
+        # Groups with ≥ 10 messages
+        "active_groups": int((chat_msg_counts["msg_count"] >= 10).sum()),
+        "dist_grp": cubes["dist_grp"],
+        "state_grp": cubes["state_grp"],
+        "type_col": cubes["type_col"],
+        "type_grp": cubes["type_grp"],
+    }
+
+
+@traced()
+def district_activity(cubes, today):
+    """
+    Slide 2 – Districts (by group count) with their active members of the last 7 days.
+
+    Returns:
+        tuple: (districts, melted) all districts for the table and the top 5 of
+            them for the grouped bar chart, or (None, None) without any
+            activity in the last 7 days. None if the data has no District Name.
+    """
+    if "District Name" not in cubes["messages"].columns:
+        return None
+    weekly_fd = rollup(cubes["messages"], ["District Name", "sender_phone"], week_start(today), today, name="msg_count")
+    if weekly_fd.empty:
+        return None, None
+    weekly_fd["District Name"] = weekly_fd["District Name"].astype(str).str.strip().str.title()
+
+    # Active members (≥ 7 messages)
+    member_counts_dist = (
+        weekly_fd.groupby(["District Name", "sender_phone"])["msg_count"]
+        .sum()
+        .reset_index(name="msg_count")
+    )
+    active_members_district = (
+        member_counts_dist[member_counts_dist["msg_count"] >= 7]
+        .groupby("District Name")["sender_phone"]
+        .nunique()
+        .reset_index(name="Active Members")
+    )
+
+    # Merge with Slide 1 group counts, chart the top 5 districts by Group Count
+    combined = pd.merge(
+        active_members_district,
+        cubes["dist_grp"],
+        on="District Name",
+        how="right"
+    ).fillna(0)
+    districts = combined.sort_values("Group Count", ascending=False)
+
+    melted = districts.head(5).melt(
+        id_vars="District Name",
+        value_vars=["Active Members", "Group Count"],
+        var_name="Type",
+        value_name="Count"
+    )
+    return districts, melted
+
+
+@traced()
+def membership_movement(cubes, start_date, end_date):
+    """
+    Slide 3 – Member join/leave dynamics.
+
+    Returns:
+        tuple: (net_joins, trend) net adds-minus-leaves of the last week of the
+            range and the daily add/leave counts of its last 6 weeks.
+    """
+    noti_cube = cubes["notifications"]
+
+    # Past week net joins
+    one_week_ago = max(start_date, end_date - timedelta(days=7))
+    weekly_moves = rollup(noti_cube, ["type"], one_week_ago, end_date).set_index("type")["count"]
+    net_joins = int(weekly_moves.get('add', 0) - weekly_moves.get('leave', 0))
+
+    # 6-week trend
+    six_week_ago = max(start_date, end_date - timedelta(days=42))
+    movement_long = noti_cube[noti_cube['type'].isin(['add', 'leave'])]
+    trend = rollup(movement_long, ["date_new", "type"], six_week_ago, end_date, name="Count")
+    return net_joins, trend
+
+
+@traced()
+def message_patterns(cubes, start_date, end_date):
+    """
+    Slide 4 – Top disseminators, reactions by type and top messages by reactions.
+
+    Returns:
+        tuple: (top_posters, reaction_counts, top_reacted) all posters by message
+            count, top 5 reactions and top 5 messages; the last two are None
+            without reactions in the range.
+    """
+    # Disseminators, last 10 digits of the phone only
+    top_posters = rollup(cubes["messages"], ["sender_phone"], start_date, end_date, name="Message Count")
+    top_posters["sender_phone"] = top_posters["sender_phone"].astype(str).str[-10:]
+    top_posters = top_posters.sort_values("Message Count", ascending=False)
+
+    # Top 5 reactions
+    rec_cube = cubes["reactions"]
+    reaction_counts = rollup(rec_cube, ["reaction"], start_date, end_date, name="Count")
+    if reaction_counts.empty:
+        return top_posters, None, None
+    reaction_counts = reaction_counts.rename(columns={'reaction': 'Reaction'})
+    reaction_counts = reaction_counts.sort_values('Count', ascending=False).head(5)
+
+    # Reactions per unique message (text + group)
+    reacted = rollup(rec_cube, ["message_id"], start_date, end_date)
+    top_reacted = (
+        reacted.merge(cubes["message_text"], on='message_id')
+        .groupby(['chats_name', 'body'], observed=True)['count']
+        .sum()
+        .reset_index(name='Reaction Count')
+        .sort_values('Reaction Count', ascending=False)
+        .head(5)
+    )
+    top_reacted['Message'] = top_reacted['body'].apply(_truncate)
+    return top_posters, reaction_counts, top_reacted
+
+
+@traced()
+def district_rankings(cubes, start_date, end_date):
+    """
+    Slide 5 – Districts ranked by a composite of group count and message count ranks.
+
+    Returns:
+        pd.DataFrame: All districts, best first, with Group/Message Count, ranks and Comp Score.
+    """
+    district_msgs = rollup(cubes["messages"], ["District Name"], start_date, end_date, name="Message Count")
+    perf = pd.merge(cubes["dist_grp"], district_msgs, on="District Name", how="left").fillna(0)
+
+    # Ranking
+    perf["Group Rank"] = perf["Group Count"].rank(ascending=False)
+    perf["Msg Rank"]   = perf["Message Count"].rank(ascending=False)
+
+    perf["Composite Score"] = (0.25 * perf["Group Rank"]) + (0.75 * perf["Msg Rank"])
+    perf["Comp Score"] = round((1 / perf["Composite Score"]) * 10, 2)
+
+    return perf.sort_values("Composite Score")
@@ -0,0 +1,158 @@
+import pandas as pd
+import json
+import os
+import shutil
+import threading
+from datetime import date, datetime
+import slides
+from charts import CHARTS
+from pipeline import local_today
+
+
+# Published dashboard data: one folder per snapshot, LATEST names the current one.
+# A snapshot is written completely under a temporary name, renamed into place
+# and only then made current by atomically replacing LATEST.
+SNAPSHOT_DIR = os.path.join("cache", "snapshots")
+LATEST_FILE = os.path.join(SNAPSHOT_DIR, "LATEST")
+
+# Older snapshots kept next to the current one (readers may still hold them)
+KEEP_SNAPSHOTS = 3
+
+# Prebuilt default view of every slide (see build_views), one compact file
+VIEWS_FILE = "views.pkl.gz"
+
+
+def _to_json(value):
+    if isinstance(value, (date, datetime)):
+        return {"__date__": value.isoformat()}
+    return value
+
+
+def _from_json(value):
+    if isinstance(value, dict) and "__date__" in value:
+        return date.fromisoformat(value["__date__"])
+    return value
+
+
+def build_views(cubes, today=None):
+    """
+    Run every slide for the default sidebar filters, figures included.
+
+    This is the whole dashboard computed headless: a viewer opening the app
+    with the default filters only renders these results.
+
+    Args:
+        cubes (dict): Output of cubes.build_cubes.
+        today (date, optional): Local day of the weekly window (default: today).
+
+    Returns:
+        dict: today, the min_date/max_date bounds and "slides", mapping (slide name, *filter args)
+            to {"data": slide data, "figures": Plotly figure JSON (None for a missing chart)}.
+    """
+    today = today or local_today()
+    start_date, end_date = slides.default_range(cubes)
+
+    views = {"today": today, "min_date": cubes["min_date"], "max_date": cubes["max_date"], "slides": {}}
+    for name, build_charts in CHARTS.items():
+        args = slides.slide_args(name, today, start_date, end_date)
+        data = getattr(slides, name)(cubes, *args)
+        figures = [fig.to_json() if fig is not None else None for fig in build_charts(data)]
+        views["slides"][(name, *args)] = {"data": data, "figures": figures}
+    return views
+
+
+def publish_snapshot(cubes, version, views=None):
+    """
+    Atomically publish the cubes (see cubes.build_cubes) as the current snapshot.
+
+    DataFrames are stored as Parquet, everything else in meta.json; prebuilt
+    slide views (see build_views) go to one gzipped pickle.
+
+    Args:
+        cubes (dict): Output of cubes.build_cubes.
+        version (tuple): (store data version, mapping version) the cubes were built from.
+        views (dict, optional): Output of build_views.
+
+    Returns:
+        str: Id of the published snapshot.
+    """
+    snapshot_id = datetime.utcnow().strftime("%Y%m%dT%H%M%S%fZ")
+    folder = os.path.join(SNAPSHOT_DIR, snapshot_id)
+    tmp = f"{folder}.{threading.get_ident()}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+
+    meta = {
+        "id": snapshot_id,
+        "version": list(version),
+        "today": str(views["today"]) if views else None,
+        "frames": [],
+        "values": {},
+    }
+    for key, value in cubes.items():
+        if isinstance(value, pd.DataFrame):
+            value.to_parquet(os.path.join(tmp, f"{key}.parquet"), index=False)
+            meta["frames"].append(key)
+        else:
+            meta["values"][key] = _to_json(value)
+    if views is not None:
+        pd.to_pickle(views, os.path.join(tmp, VIEWS_FILE))
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    os.replace(tmp, folder)
+    latest_tmp = f"{LATEST_FILE}.{threading.get_ident()}.tmp"
+    with open(latest_tmp, "w") as f:
+        f.write(snapshot_id)
+    os.replace(latest_tmp, LATEST_FILE)
+
+    _prune(keep=snapshot_id)
+    print(f"📦 Published snapshot {snapshot_id}")
+    return snapshot_id
+
+
+def _prune(keep):
+    ids = sorted(d for d in os.listdir(SNAPSHOT_DIR)
+                 if os.path.isdir(os.path.join(SNAPSHOT_DIR, d)) and not d.endswith(".tmp"))
+    for old in ids[:-KEEP_SNAPSHOTS]:
+        if old != keep:
+            shutil.rmtree(os.path.join(SNAPSHOT_DIR, old), ignore_errors=True)
+
+
+def latest_snapshot():
+    """Id of the current snapshot, or None if nothing was published yet."""
+    if not os.path.exists(LATEST_FILE):
+        return None
+    with open(LATEST_FILE) as f:
+        snapshot_id = f.read().strip()
+    return snapshot_id if os.path.isdir(os.path.join(SNAPSHOT_DIR, snapshot_id)) else None
+
+
+def snapshot_meta(snapshot_id):
+    """meta.json of a published snapshot (id, version, today, frames, values)."""
+    with open(os.path.join(SNAPSHOT_DIR, snapshot_id, "meta.json")) as f:
+        return json.load(f)
+
+
+def read_snapshot(snapshot_id):
+    """
+    Load a published snapshot back into the cubes dict it was built from.
+
+    Args:
+        snapshot_id (str): Id from latest_snapshot.
+
+    Returns:
+        dict: Same layout as cubes.build_cubes.
+    """
+    folder = os.path.join(SNAPSHOT_DIR, snapshot_id)
+    meta = snapshot_meta(snapshot_id)
+
+    cubes = {key: _from_json(value) for key, value in meta["values"].items()}
+    for key in meta["frames"]:
+        cubes[key] = pd.read_parquet(os.path.join(folder, f"{key}.parquet"))
+    return cubes
+
+
+def read_views(snapshot_id):
+    """Prebuilt slide views of a snapshot (see build_views), or None if it has none."""
+    path = os.path.join(SNAPSHOT_DIR, snapshot_id, VIEWS_FILE)
+    return pd.read_pickle(path) if os.path.exists(path) else None
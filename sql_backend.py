@@ -0,0 +1,351 @@
+import os
+import threading
+import pandas as pd
+from datetime import timedelta
+from store import partition_files, data_version
+from schema import ENTITIES
+from mapping import chat_lookup
+from pipeline import TIMEZONE, TYPE_MAP, EXCLUDED_GROUPS, META_COLS
+from slides import week_start
+from perf import traced
+
+try:
+    import duckdb
+except ImportError:  # optional: pip install duckdb
+    duckdb = None
+
+
+# Optional query backend: the slides of slides.py as SQL run by DuckDB
+# directly over the Parquet store, instead of over in-memory cubes. Only the
+# partitions of the requested dates / org phones are scanned, within a file
+# only the columns a query needs are read, and DuckDB aggregates them on all
+# cores; nothing but the slide results reaches pandas, however long the range.
+
+# Parquet schema dtypes -> SQL types (for entities with nothing stored yet)
+SQL_TYPES = {"string": "VARCHAR", "datetime64[ns, UTC]": "TIMESTAMPTZ"}
+
+
+def available():
+    """True if duckdb is installed."""
+    return duckdb is not None
+
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _ident(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _day(alias, ts_col="timestamp"):
+    """Local (IST) day of a row's timestamp, the SQL twin of pipeline.add_day_columns."""
+    return f"CAST(timezone('{TIMEZONE}', {alias}.{_ident(ts_col)}) AS DATE)"
+
+
+def _message_type(alias):
+    cases = " ".join(f"WHEN {_literal(k)} THEN {_literal(v)}" for k, v in TYPE_MAP.items())
+    return f"CASE {alias}.message_type {cases} ELSE 'Other' END"
+
+
+class SqlBackend:
+    """
+    Slide queries over the local store, returning what the slides.py functions return.
+
+    Every slide method takes the same filter arguments as its slides.py twin
+    (see slides.slide_args) and its results feed charts.CHARTS unchanged.
+    Stored records are read at query time and the group chat tables are
+    rebuilt whenever the store's data version moves, so new syncs show up
+    without recreating the backend; the chat mapping is loaded once.
+
+    Args:
+        mapping_version (str, optional): Mapping version (see mapping.chat_lookup).
+        org_phones (list, optional): Only read these org phones' partitions.
+        threads (int, optional): DuckDB worker threads (default: all cores).
+    """
+
+    def __init__(self, mapping_version=None, org_phones=None, threads=None):
+        if duckdb is None:
+            raise RuntimeError("The SQL backend needs duckdb (pip install duckdb)")
+        self.org_phones = org_phones
+
+        self._lock = threading.Lock()
+        self._con = duckdb.connect()
+        self._con.execute(f"SET threads TO {int(threads or os.cpu_count() or 1)}")
+        self._con.create_function("title_case", str.title, ["VARCHAR"], "VARCHAR")
+
+        lookup = chat_lookup(mapping_version).reset_index()
+        self._con.register("lookup_df", lookup)
+        self._con.execute("CREATE TABLE mapping AS SELECT * FROM lookup_df")
+        self._con.unregister("lookup_df")
+        self.meta_cols = [c for c in [*META_COLS, 'Group type'] if c in lookup.columns]
+        self._chats_version = None
+
+    # ------------------------------------------------------------------
+    # Scans
+    # ------------------------------------------------------------------
+    def _scan(self, entity, start_date=None, end_date=None):
+        """
+        FROM clause reading an entity's partitions that can hold local days [start_date, end_date].
+
+        Partitions are dated in UTC, so the day before start_date is included
+        (IST runs ahead of UTC); queries still filter on the exact local day.
+        """
+        first = start_date - timedelta(days=1) if start_date else None
+        files = partition_files(entity, first, end_date, self.org_phones)
+        if files:
+            return f"read_parquet([{', '.join(_literal(f) for f in files)}], union_by_name=true)"
+        columns = ", ".join(
+            f"CAST(NULL AS {SQL_TYPES.get(dtype, 'VARCHAR')}) AS {_ident(col)}"
+            for col, dtype in ENTITIES[entity]["schema"].items()
+        )
+        return f"(SELECT {columns} WHERE false)"
+
+    def _messages(self, start_date=None, end_date=None):
+        """Group chat messages of local days [start_date, end_date] with their chat metadata."""
+        meta = ", ".join(f"g.{_ident(c)}" for c in self.meta_cols if c != 'chat_id')
+        return f"""
+            SELECT g.chat_id, {meta},
+                   replace(m.sender_phone, '@c.us', '') AS sender_phone,
+                   {_message_type('m')} AS message_type,
+                   m.message_id, m.body, {_day('m')} AS day
+            FROM {self._scan("messages", start_date, end_date)} m
+            JOIN group_chats g ON g.chat_id = m.chat_id
+            WHERE {_day('m')} BETWEEN $start AND $end
+        """
+
+    def _reactions(self, start_date, end_date):
+        return f"""
+            SELECT r.message_id, coalesce(r.reaction, 'None') AS reaction
+            FROM {self._scan("reactions", start_date, end_date)} r
+            JOIN group_chats g ON g.chat_id = r.chat_id
+            WHERE {_day('r')} BETWEEN $start AND $end
+        """
+
+    def _notifications(self, start_date, end_date):
+        return f"""
+            SELECT n.type, {_day('n')} AS day
+            FROM {self._scan("notifications", start_date, end_date)} n
+            JOIN group_chats g ON g.chat_id = n.chat_id
+            WHERE {_day('n')} BETWEEN $start AND $end
+        """
+
+    def query(self, sql, params=None):
+        """Run a query on the backend's connection and return the result as a DataFrame."""
+        with self._lock:
+            self._build_chat_tables()
+            return self._con.execute(sql, params or {}).df()
+
+    def _build_chat_tables(self):
+        """
+        (Re)build group_chats (mapped group chats, as pipeline.build_chat_df) and
+        their group counts if the store changed since the last build; needs self._lock.
+        """
+        version = data_version()
+        if version == self._chats_version:
+            return
+        columns = ", ".join(f"m.{_ident(c)}" for c in self.meta_cols)
+        excluded = ", ".join(_literal(g) for g in EXCLUDED_GROUPS)
+        self._con.execute(f"""
+            CREATE OR REPLACE TABLE group_chats AS
+            SELECT {columns}
+            FROM (SELECT DISTINCT chat_id FROM {self._scan("chats")} WHERE chat_type = 'group') c
+            JOIN mapping m ON m.chat_id = c.chat_id
+            WHERE m."Group type" IS NOT NULL
+              AND (m.chats_name IS NULL OR m.chats_name NOT IN ({excluded}))
+        """)
+        self._con.execute("""
+            CREATE OR REPLACE TABLE dist_grp AS
+            SELECT "District Name", count(DISTINCT chat_id) AS "Group Count"
+            FROM group_chats
+            WHERE "Group type" = 'District' AND "District Name" IS NOT NULL
+            GROUP BY 1 ORDER BY 1
+        """)
+        self._chats_version = version
+
+    def _group_counts(self, col):
+        return self.query(f"""
+            SELECT {_ident(col)}, count(DISTINCT chat_id) AS "Group Count"
+            FROM group_chats WHERE {_ident(col)} IS NOT NULL
+            GROUP BY 1 ORDER BY 1
+        """)
+
+    # ------------------------------------------------------------------
+    # Slides
+    # ------------------------------------------------------------------
+    def bounds(self):
+        """Sidebar date bounds, as the min_date/max_date of pipeline.preprocess."""
+        sql = f"""
+            SELECT min(day) AS min_date, max(day) AS max_date FROM (
+                SELECT {_day('c', 'created_at')} AS day FROM {self._scan("chats")} c
+                WHERE c.chat_type = 'group' AND c.chat_id IN (SELECT chat_id FROM group_chats)
+                UNION ALL SELECT {_day('m')} FROM {self._scan("messages")} m
+                UNION ALL SELECT {_day('n')} FROM {self._scan("notifications")} n
+            ) WHERE day > DATE '2000-01-01'
+        """
+        with self._lock:
+            self._build_chat_tables()
+            min_date, max_date = self._con.execute(sql).fetchone()
+        return {"min_date": min_date, "max_date": max_date}
+
+    @traced()
+    def topline(self, today):
+        """Slide 1 – see slides.topline."""
+        params = {"start": week_start(today), "end": today}
+        counts = self.query(f"""
+            WITH messages AS ({self._messages(params["start"], today)}),
+            senders AS MATERIALIZED (
+                SELECT sender_phone, count(*) AS n FROM messages
+                WHERE sender_phone IS NOT NULL GROUP BY 1
+            ),
+            chats AS (SELECT chat_id, count(*) AS n FROM messages GROUP BY 1)
+            SELECT
+                (SELECT count(*) FROM senders) AS unique_individuals,
+                (SELECT count(*) FROM senders WHERE n >= 7) AS total_members,
+                (SELECT count(*) FROM chats WHERE n >= 10) AS active_groups,
+                (SELECT count(*) FROM group_chats) AS total_groups
+        """, params).iloc[0]
+
+        # Groups by Mandal / Group Type
+        type_col = None
+        if "Block" in self.meta_cols and self.query(
+                'SELECT count("Block") AS n FROM group_chats')["n"].iloc[0]:
+            type_col = "Block"
+        elif "Group type" in self.meta_cols:
+            type_col = "Group type"
+
+        return {
+            "total_groups": int(counts["total_groups"]),
+            "unique_individuals": int(counts["unique_individuals"]),
+            "total_members": int(counts["total_members"]),
+            "active_groups": int(counts["active_groups"]),
+            "dist_grp": self.query("SELECT * FROM dist_grp"),
+            "state_grp": self._group_counts("State Name") if "State Name" in self.meta_cols else None,
+            "type_col": type_col,
+            "type_grp": self._group_counts(type_col) if type_col else None,
+        }
+
+    @traced()
+    def district_activity(self, today):
+        """Slide 2 – see slides.district_activity."""
+        if "District Name" not in self.meta_cols:
+            return None
+        params = {"start": week_start(today), "end": today}
+        districts = self.query(f"""
+            WITH messages AS ({self._messages(params["start"], today)}),
+            weekly AS MATERIALIZED (
+                SELECT title_case(trim(CAST("District Name" AS VARCHAR))) AS district,
+                       sender_phone, count(*) AS n
+                FROM messages
+                WHERE "District Name" IS NOT NULL AND sender_phone IS NOT NULL
+                GROUP BY 1, 2
+            ),
+            active AS (
+                SELECT district, count(DISTINCT sender_phone) AS members
+                FROM weekly WHERE n >= 7 GROUP BY 1
+            )
+            SELECT d."District Name",
+                   CAST(coalesce(a.members, 0) AS DOUBLE) AS "Active Members",
+                   d."Group Count"
+            FROM dist_grp d LEFT JOIN active a ON a.district = d."District Name"
+            WHERE EXISTS (SELECT 1 FROM weekly)
+            ORDER BY d."Group Count" DESC, d."District Name"
+        """, params)
+        if districts.empty:
+            return None, None
+
+        melted = districts.head(5).melt(
+            id_vars="District Name",
+            value_vars=["Active Members", "Group Count"],
+            var_name="Type",
+            value_name="Count"
+        )
+        return districts, melted
+
+    @traced()
+    def membership_movement(self, start_date, end_date):
+        """Slide 3 – see slides.membership_movement."""
+        one_week_ago = max(start_date, end_date - timedelta(days=7))
+        six_week_ago = max(start_date, end_date - timedelta(days=42))
+        params = {"start": six_week_ago, "end": end_date}
+
+        trend = self.query(f"""
+            SELECT CAST(day AS TIMESTAMP) AS date_new, type, count(*) AS "Count"
+            FROM ({self._notifications(six_week_ago, end_date)})
+            WHERE type IN ('add', 'leave')
+            GROUP BY 1, 2 ORDER BY 1, 2
+        """, params)
+        week = trend[trend["date_new"] >= pd.Timestamp(one_week_ago)].groupby("type")["Count"].sum()
+        net_joins = int(week.get('add', 0) - week.get('leave', 0))
+        return net_joins, trend
+
+    @traced()
+    def message_patterns(self, start_date, end_date):
+        """Slide 4 – see slides.message_patterns."""
+        params = {"start": start_date, "end": end_date}
+
+        # Disseminators, last 10 digits of the phone only
+        top_posters = self.query(f"""
+            SELECT right(sender_phone, 10) AS sender_phone, count(*) AS "Message Count"
+            FROM ({self._messages(start_date, end_date)})
+            WHERE sender_phone IS NOT NULL
+            GROUP BY sender_phone ORDER BY 2 DESC, sender_phone
+        """, params)
+
+        # Top 5 reactions
+        reactions = self._reactions(start_date, end_date)
+        reaction_counts = self.query(f"""
+            SELECT reaction AS "Reaction", count(*) AS "Count"
+            FROM ({reactions}) GROUP BY 1 ORDER BY 2 DESC, 1 LIMIT 5
+        """, params)
+        if reaction_counts.empty:
+            return top_posters, None, None
+
+        # Reactions per unique message (text + group); messages precede their reactions
+        top_reacted = self.query(f"""
+            WITH reacted AS MATERIALIZED (
+                SELECT message_id, count(*) AS n FROM ({reactions})
+                WHERE message_id IS NOT NULL GROUP BY 1
+            ),
+            texts AS (
+                SELECT DISTINCT ON (m.message_id) m.message_id, g.chats_name, m.body
+                FROM {self._scan("messages", None, end_date)} m
+                JOIN group_chats g ON g.chat_id = m.chat_id
+                WHERE m.message_id IN (SELECT message_id FROM reacted)
+            )
+            SELECT t.chats_name, t.body, CAST(sum(r.n) AS BIGINT) AS "Reaction Count",
+                   CASE WHEN length(t.body) > 120 THEN left(t.body, 120) || '...' ELSE t.body END AS "Message"
+            FROM reacted r JOIN texts t ON t.message_id = r.message_id
+            WHERE t.chats_name IS NOT NULL AND t.body IS NOT NULL
+            GROUP BY t.chats_name, t.body ORDER BY 3 DESC LIMIT 5
+        """, params)
+        return top_posters, reaction_counts, top_reacted
+
+    @traced()
+    def district_rankings(self, start_date, end_date):
+        """Slide 5 – see slides.district_rankings (ties share their average rank)."""
+        return self.query(f"""
+            WITH district_msgs AS (
+                SELECT "District Name", count(*) AS n
+                FROM ({self._messages(start_date, end_date)})
+                WHERE "District Name" IS NOT NULL GROUP BY 1
+            ),
+            perf AS (
+                SELECT d."District Name", d."Group Count",
+                       coalesce(m.n, 0) AS "Message Count"
+                FROM dist_grp d LEFT JOIN district_msgs m ON m."District Name" = d."District Name"
+            ),
+            ranked AS (
+                SELECT *,
+                    rank() OVER (ORDER BY "Group Count" DESC)
+                        + (count(*) OVER (PARTITION BY "Group Count") - 1) / 2.0 AS "Group Rank",
+                    rank() OVER (ORDER BY "Message Count" DESC)
+                        + (count(*) OVER (PARTITION BY "Message Count") - 1) / 2.0 AS "Msg Rank"
+                FROM perf
+            ),
+            scored AS (
+                SELECT *, 0.25 * "Group Rank" + 0.75 * "Msg Rank" AS "Composite Score" FROM ranked
+            )
+            SELECT *, round(10 / "Composite Score", 2) AS "Comp Score"
+            FROM scored ORDER BY "Composite Score", "District Name"
+        """, {"start": start_date, "end": end_date})
@@ -0,0 +1,228 @@
+import pandas as pd
+import pyarrow as pa
+import os
+import threading
+import time
+from contextlib import contextmanager
+from schema import ENTITIES, FALLBACK_KEY, normalize, make_parquet_safe
+from perf import traced
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, threads only
+    fcntl = None
+
+
+# One Parquet dataset per entity (see schema.ENTITIES), partitioned as
+# <entity>/org_phone=<org>/date=<YYYY-MM-DD>/part-0.parquet
+STORE_DIR = os.path.join("cache", "store")
+
+UNKNOWN = "unknown"
+
+# Bumped on every write; lets readers cache anything derived from the store
+VERSION_FILE = os.path.join(STORE_DIR, "_version")
+
+_write_locks = {name: threading.Lock() for name in ENTITIES}
+
+
+@contextmanager
+def _entity_lock(entity):
+    """
+    Hold the write lock of an entity, across threads and processes.
+
+    The dashboard/refresh sync and the webhook receiver (webhook.py) run as
+    separate processes and may merge into the same partition; without the
+    file lock the later read-merge-replace would drop the other's rows.
+    """
+    with _write_locks[entity]:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(STORE_DIR, exist_ok=True)
+        with open(os.path.join(STORE_DIR, f"_{entity}.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def dedupe(df, entity):
+    """Drop duplicate records of an entity, keeping the most recent copy."""
+    id_field = ENTITIES[entity]["id_field"]
+    if id_field in df.columns and df[id_field].notna().all():
+        return df.drop_duplicates(subset=[id_field], keep="last")
+    key = [c for c in FALLBACK_KEY if c in df.columns]
+    return df.drop_duplicates(subset=key or None, keep="last")
+
+
+def _fingerprint(df):
+    """Order-independent digest of a partition's rows, to tell whether a merge changed it."""
+    columns = sorted(df.columns)
+    hashes = pd.util.hash_pandas_object(df[columns].astype(str), index=False)
+    return columns, sorted(hashes)
+
+
+def _clean(value):
+    return str(value).replace("/", "_").replace(os.sep, "_")
+
+
+def partition_path(entity, org_phone, date):
+    return os.path.join(STORE_DIR, entity, f"org_phone={_clean(org_phone)}", f"date={date}", "part-0.parquet")
+
+
+@traced(attrs=("entity",))
+def write_entity(entity, df, normalized=False):
+    """
+    Merge new records of an entity into its org_phone/date partitions.
+
+    Only the partitions touched by `df` are rewritten (existing rows are kept,
+    duplicates resolved in favour of the new copy), and only if the merge
+    changed them, so re-sent records leave files and data_version alone. Each
+    file is replaced atomically, under a per-entity file lock shared with
+    other processes writing the store.
+
+    Args:
+        entity (str): One of ENTITIES.
+        df (pd.DataFrame): New records (raw API fields, org_phone tagged).
+        normalized (bool): `df` already went through schema.normalize (default=False).
+
+    Returns:
+        int: Number of partitions written (changed).
+    """
+    if df.empty:
+        return 0
+
+    if not normalized:
+        df = normalize(df.copy(), entity)
+    time_field = ENTITIES[entity]["time_field"]
+
+    if time_field in df.columns:
+        dates = df[time_field].dt.strftime("%Y-%m-%d").fillna(UNKNOWN)
+    else:
+        dates = pd.Series(UNKNOWN, index=df.index)
+    orgs = df["org_phone"].fillna(UNKNOWN) if "org_phone" in df.columns else pd.Series(UNKNOWN, index=df.index)
+
+    written = 0
+    with _entity_lock(entity):
+        for (org, date), part in df.groupby([orgs.astype(str), dates], sort=False):
+            path = partition_path(entity, org, date)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                merged = pd.concat([pd.read_parquet(path), part], ignore_index=True)
+                stored = merged.iloc[:len(merged) - len(part)]  # same dtypes as the merge
+                part = dedupe(merged, entity)
+                if len(part) == len(stored) and _fingerprint(part) == _fingerprint(stored):
+                    continue
+            tmp = path + ".tmp"
+            try:
+                part.to_parquet(tmp, index=False)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                make_parquet_safe(part).to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+            written += 1
+
+    if written:
+        _bump_version()
+    return written
+
+
+def _bump_version():
+    os.makedirs(STORE_DIR, exist_ok=True)
+    tmp = f"{VERSION_FILE}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(str(time.time_ns()))
+    os.replace(tmp, VERSION_FILE)
+
+
+def data_version():
+    """Stamp of the last store write ("0" if nothing was written yet), usable as a cache key."""
+    if not os.path.exists(VERSION_FILE):
+        return "0"
+    with open(VERSION_FILE) as f:
+        return f.read().strip() or "0"
+
+
+def _partitions(entity):
+    root = os.path.join(STORE_DIR, entity)
+    if not os.path.isdir(root):
+        return
+    for org_dir in os.listdir(root):
+        if not org_dir.startswith("org_phone="):
+            continue
+        for date_dir in os.listdir(os.path.join(root, org_dir)):
+            path = os.path.join(root, org_dir, date_dir, "part-0.parquet")
+            if date_dir.startswith("date=") and os.path.exists(path):
+                yield org_dir.split("=", 1)[1], date_dir.split("=", 1)[1], path
+
+
+def partition_files(entity, start_date=None, end_date=None, org_phones=None):
+    """
+    Paths of an entity's partitions that can hold records within the filters.
+
+    Partitions are pruned on their org_phone and (UTC) date directory names;
+    undated partitions are only included when no date filter is given.
+
+    Args:
+        entity (str): One of ENTITIES.
+        start_date (date or str, optional): First day to read (inclusive).
+        end_date (date or str, optional): Last day to read (inclusive).
+        org_phones (list, optional): Only read these org phone partitions.
+
+    Returns:
+        list: Sorted Parquet file paths.
+    """
+    start = str(start_date) if start_date else None
+    end = str(end_date) if end_date else None
+    orgs = {_clean(o) for o in org_phones} if org_phones else None
+
+    files = []
+    for org, date, path in _partitions(entity):
+        if orgs is not None and org not in orgs:
+            continue
+        if date == UNKNOWN:
+            if start or end:
+                continue
+        elif (start and date < start) or (end and date > end):
+            continue
+        files.append(path)
+    return sorted(files)
+
+
+@traced(attrs=("entity", "start_date", "end_date"))
+def read_entity(entity, start_date=None, end_date=None, org_phones=None, columns=None):
+    """
+    Read an entity from the local store, pruning partitions outside the filters.
+
+    Args:
+        entity (str): One of ENTITIES.
+        start_date (date or str, optional): First day to read (inclusive).
+        end_date (date or str, optional): Last day to read (inclusive).
+        org_phones (list, optional): Only read these org phone partitions.
+        columns (list, optional): Only read these columns.
+
+    Returns:
+        pd.DataFrame: Matching records (empty if nothing is stored).
+    """
+    files = partition_files(entity, start_date, end_date, org_phones)
+    if not files:
+        return pd.DataFrame()
+
+    frames = [pd.read_parquet(f, columns=columns) for f in files]
+    return pd.concat(frames, ignore_index=True)
+
+
+def partition_dates(entity):
+    """Sorted list of the dates (YYYY-MM-DD) stored for an entity."""
+    return sorted({date for _, date, _ in _partitions(entity) if date != UNKNOWN})
+
+
+def list_org_phones(entity):
+    """Sorted list of the org phones stored for an entity."""
+    return sorted({org for org, _, _ in _partitions(entity)} - {UNKNOWN})
+
+
+def has_data(entity, org_phone=None):
+    """True if the store holds any partition of this entity (and org phone, if given)."""
+    org = _clean(org_phone) if org_phone else None
+    return any(org is None or o == org for o, _, _ in _partitions(entity))
@@ -0,0 +1,454 @@
+"""
+Local webhook receiver: Periskope events are written straight into the local
+store, so new messages, reactions and join/leave notifications show up
+without polling the API.
+
+    python webhook.py serve --port 8765                 # receive events
+    python webhook.py replay events.ndjson --url URL    # post recorded events
+
+Run it next to `python refresh.py --no-sync --every 1`, which republishes the
+snapshot from the store as events come in; an occasional regular refresh
+(with the API sync) reconciles anything the webhook missed.
+
+Each POST carries one event or a list of events:
+
+    {"event": "message.created", "org_phone": "91...", "data": {...record...}}
+
+The org_phone (of the record, else of the event) is stored in the form the
+API sync uses for that entity, with or without "@c.us" (see ORG_SUFFIX).
+
+Accepted events are spooled to disk before they are acknowledged and written
+to the store in batches (see EventBatcher). If PERISKOPE_WEBHOOK_SECRET (or
+--secret) is set, requests must carry the hex HMAC-SHA256 of their body in
+the X-Periskope-Signature header.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+import traceback
+import pandas as pd
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from fetcher import get_session
+from ingest import page_batches, collect
+from msg import flatten_messages
+from schema import ENTITIES
+from store import write_entity
+
+
+# Event type -> entity of the store; other event types are acknowledged and ignored
+EVENT_ENTITIES = {
+    "chat.created": "chats",
+    "chat.updated": "chats",
+    "message.created": "messages",
+    "message.updated": "messages",
+    "reaction.created": "reactions",
+    "reaction.updated": "reactions",
+    "chat.notification.created": "notifications",
+}
+
+# Raw records are reshaped like the fetched pages of the same entity
+TRANSFORMS = {"messages": flatten_messages}
+
+# org_phone as the API sync stores it (and so the store partition): messages
+# keep the API's "<phone>@c.us", the other entities are tagged with the bare
+# phone. A webhook copy of a polled record must land in the same partition,
+# where store.dedupe resolves the two.
+ORG_SUFFIX = {"messages": "@c.us"}
+
+# Accepted, not yet stored events (NDJSON), replayed into the store on startup
+SPOOL_DIR = os.path.join("cache", "webhook")
+
+SIGNATURE_HEADER = "X-Periskope-Signature"
+
+# Largest request body accepted (bytes)
+MAX_BODY = 5 * 1024 * 1024
+
+# Event timestamps outside [EARLIEST_TIME, now + MAX_CLOCK_SKEW] are rejected
+EARLIEST_TIME = pd.Timestamp("2000-01-01", tz="UTC")
+MAX_CLOCK_SKEW = pd.Timedelta(days=1)
+
+# Epoch numbers at or above this are milliseconds, below it seconds
+# (1e11 seconds is the year 5138, 1e11 milliseconds March 1973)
+EPOCH_MS_FROM = 1e11
+
+
+def canonical_org_phone(entity, org_phone):
+    """org_phone in the form the API sync stores for `entity` (see ORG_SUFFIX)."""
+    phone = str(org_phone).strip().removesuffix("@c.us")
+    return phone + ORG_SUFFIX.get(entity, "")
+
+
+def parse_time(value):
+    """
+    Parse an event timestamp: an ISO-8601 string or epoch seconds/milliseconds.
+
+    Returns:
+        pd.Timestamp: UTC time.
+
+    Raises:
+        ValueError: The value is missing, unparseable or outside the plausible window.
+    """
+    if isinstance(value, str) and value.strip().lstrip("-").replace(".", "", 1).isdigit():
+        value = float(value)
+    if isinstance(value, bool) or value is None:
+        raise ValueError("not a timestamp")
+    try:
+        if isinstance(value, (int, float)):
+            unit = "ms" if abs(value) >= EPOCH_MS_FROM else "s"
+            ts = pd.to_datetime(value, unit=unit, utc=True)
+        elif isinstance(value, str):
+            ts = pd.to_datetime(value, utc=True)
+        else:
+            raise ValueError("not a timestamp")
+    except (TypeError, ValueError, OverflowError, pd.errors.OutOfBoundsDatetime):
+        raise ValueError("not a timestamp") from None
+    if pd.isna(ts):
+        raise ValueError("not a timestamp")
+    if not EARLIEST_TIME <= ts <= pd.Timestamp.now(tz="UTC") + MAX_CLOCK_SKEW:
+        raise ValueError(f"{ts.isoformat()} is outside the plausible window")
+    return ts
+
+
+def validate_event(event):
+    """
+    Check one event and extract the record it carries.
+
+    Args:
+        event (dict): Decoded event ({"event", "org_phone", "data"}).
+
+    Returns:
+        tuple: (entity, record); entity is None for event types that are not stored.
+
+    Raises:
+        ValueError: The event is malformed or its record lacks its id, chat_id or a
+            plausible timestamp (the record carries it back as an ISO-8601 UTC string).
+    """
+    if not isinstance(event, dict) or not isinstance(event.get("event"), str):
+        raise ValueError("not an event object with an 'event' type")
+    entity = EVENT_ENTITIES.get(event["event"])
+    if entity is None:
+        return None, None
+
+    record = event.get("data")
+    if not isinstance(record, dict):
+        raise ValueError("'data' must be an object")
+    cfg = ENTITIES[entity]
+    if not record.get(cfg["id_field"]):
+        raise ValueError(f"missing {cfg['id_field']}")
+    if not record.get("chat_id"):
+        raise ValueError("missing chat_id")  # could never be attributed to a group
+    try:
+        ts = parse_time(record.get(cfg["time_field"]))
+    except ValueError as e:
+        raise ValueError(f"missing or invalid {cfg['time_field']}: {e}") from None
+
+    org_phone = record.get("org_phone") or event.get("org_phone")
+    if not org_phone:
+        raise ValueError("missing org_phone")
+    return entity, {**record, cfg["time_field"]: ts.isoformat(),
+                    "org_phone": canonical_org_phone(entity, org_phone)}
+
+
+def store_records(entity, records):
+    """
+    Normalize raw records of one entity the way fetched pages are and merge them into the store.
+
+    Returns:
+        int: Number of records written.
+    """
+    # Newest first: page_batches keeps the first copy of a repeated id, the last event should win
+    batches = page_batches([records[::-1]], entity, transform=TRANSFORMS.get(entity))
+    df = collect(batches)
+    write_entity(entity, df, normalized=True)
+    return len(df)
+
+
+class EventBatcher:
+    """
+    Buffers accepted records and writes them to the store in batches.
+
+    Records are appended to an NDJSON spool before add() returns, so an
+    acknowledged event survives a crash; a flush rotates the spool, writes
+    every entity's records with one write_entity call and then deletes the
+    rotated file. Spool files left behind are stored by recover().
+
+    Args:
+        batch_size (int): Flush as soon as this many records are buffered (default=500).
+        flush_every (float): Flush buffered records at least every N seconds (default=5.0).
+        spool_dir (str): Spool folder (default=SPOOL_DIR).
+    """
+
+    def __init__(self, batch_size=500, flush_every=5.0, spool_dir=SPOOL_DIR):
+        self.batch_size = batch_size
+        self.flush_every = flush_every
+        self.spool_dir = spool_dir
+        self.stats = {"accepted": 0, "stored": 0, "flushes": 0, "last_flush": None}
+
+        os.makedirs(spool_dir, exist_ok=True)
+        self._pending = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._spool = open(self._spool_path(), "a", encoding="utf-8")
+        self._stop = threading.Event()
+        self._timer = threading.Thread(target=self._run, daemon=True)
+
+    def _spool_path(self):
+        return os.path.join(self.spool_dir, "pending.ndjson")
+
+    def start(self):
+        self._timer.start()
+        return self
+
+    @property
+    def buffered(self):
+        """Number of records waiting for the next flush."""
+        return self._count
+
+    def _run(self):
+        while not self._stop.wait(self.flush_every):
+            try:
+                self.flush()
+            except Exception:
+                # The rotated spool file is kept and stored by the next recover()
+                print(f"❌ Webhook flush failed:\n{traceback.format_exc()}")
+
+    def add(self, items):
+        """
+        Spool and buffer (entity, record) pairs.
+
+        Returns:
+            int: Number of records added.
+        """
+        with self._lock:
+            for entity, record in items:
+                self._spool.write(json.dumps({"entity": entity, "record": record}, ensure_ascii=False))
+                self._spool.write("\n")
+                self._pending.setdefault(entity, []).append(record)
+            self._spool.flush()
+            os.fsync(self._spool.fileno())
+            self._count += len(items)
+            self.stats["accepted"] += len(items)
+            full = self._count >= self.batch_size
+        if full:
+            self.flush()
+        return len(items)
+
+    def flush(self):
+        """Write every buffered record to the store."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._count:
+                    return 0
+                pending, self._pending, self._count = self._pending, {}, 0
+                self._spool.close()
+                rotated = os.path.join(self.spool_dir, f"flushing-{time.time_ns()}.ndjson")
+                os.replace(self._spool_path(), rotated)
+                self._spool = open(self._spool_path(), "a", encoding="utf-8")
+
+            stored = sum(store_records(entity, records) for entity, records in pending.items())
+            os.remove(rotated)
+            self.stats["stored"] += stored
+            self.stats["flushes"] += 1
+            self.stats["last_flush"] = time.time()
+            print(f"[webhook] Stored {stored} records ({', '.join(f'{e}: {len(r)}' for e, r in pending.items())})")
+            return stored
+
+    def recover(self):
+        """Store the records of spool files left by an earlier run (call before start)."""
+        pending = {}
+        files = sorted(f for f in os.listdir(self.spool_dir) if f.endswith(".ndjson"))
+        for name in files:
+            with open(os.path.join(self.spool_dir, name), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line of a crashed write
+                    pending.setdefault(item["entity"], []).append(item["record"])
+        if not pending:
+            return 0
+
+        stored = sum(store_records(entity, records) for entity, records in pending.items())
+        with self._lock:
+            self._spool.close()
+            for name in files:
+                os.remove(os.path.join(self.spool_dir, name))
+            self._spool = open(self._spool_path(), "a", encoding="utf-8")
+        print(f"[webhook] Recovered {stored} spooled records")
+        return stored
+
+    def close(self):
+        """Stop the flush timer and store what is still buffered."""
+        self._stop.set()
+        self.flush()
+        self._spool.close()
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """POST events to any path; GET /health returns the batcher stats."""
+
+    batcher = None
+    secret = None
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/health":
+            return self._reply(404, {"error": "not found"})
+        self._reply(200, {**self.batcher.stats, "buffered": self.batcher.buffered})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            return self._reply(413, {"error": f"body larger than {MAX_BODY} bytes"})
+        body = self.rfile.read(length)
+
+        if self.secret:
+            expected = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+            if not hmac.compare_digest(expected, self.headers.get(SIGNATURE_HEADER, "")):
+                return self._reply(401, {"error": "bad signature"})
+
+        try:
+            events = json.loads(body)
+        except ValueError:
+            return self._reply(400, {"error": "body is not JSON"})
+        if not isinstance(events, list):
+            events = [events]
+
+        items, rejected, ignored = [], [], 0
+        for i, event in enumerate(events):
+            try:
+                entity, record = validate_event(event)
+            except ValueError as e:
+                rejected.append({"index": i, "error": str(e)})
+                continue
+            if entity is None:
+                ignored += 1
+            else:
+                items.append((entity, record))
+
+        if rejected and not items and not ignored:
+            return self._reply(400, {"error": "no valid events", "rejected": rejected})
+        accepted = self.batcher.add(items) if items else 0
+        self._reply(202, {"accepted": accepted, "ignored": ignored, "rejected": rejected})
+
+    def log_message(self, format, *args):
+        pass  # one line per flush instead of one per request
+
+
+def serve(host="127.0.0.1", port=8765, batch_size=500, flush_every=5.0, secret=None):
+    """
+    Run the webhook receiver until interrupted, storing what is buffered on exit.
+
+    Args:
+        host (str): Interface to bind (default=127.0.0.1).
+        port (int): Port to listen on (default=8765).
+        batch_size (int): Records per store write (see EventBatcher).
+        flush_every (float): Seconds between timed flushes (see EventBatcher).
+        secret (str, optional): Shared secret of the request signature.
+    """
+    batcher = EventBatcher(batch_size=batch_size, flush_every=flush_every)
+    batcher.recover()
+    handler = type("Handler", (WebhookHandler,), {"batcher": batcher.start(), "secret": secret})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"🔌 Webhook receiver on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+
+
+def replay(events, url, batch_size=100, secret=None, timeout=30):
+    """
+    POST recorded events to a webhook receiver, `batch_size` events per request.
+
+    Args:
+        events (iterable): Event dicts.
+        url (str): Receiver URL.
+        batch_size (int): Events per request (default=100).
+        secret (str, optional): Sign requests with this shared secret.
+        timeout (float): Request timeout in seconds.
+
+    Returns:
+        dict: Summed accepted / ignored / rejected counts of all responses.
+    """
+    totals = {"accepted": 0, "ignored": 0, "rejected": 0}
+    session = get_session()
+
+    def post(chunk):
+        body = json.dumps(chunk).encode()
+        headers = {"Content-Type": "application/json"}
+        if secret:
+            headers[SIGNATURE_HEADER] = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        response = session.post(url, data=body, headers=headers, timeout=timeout)
+        if response.status_code not in (202, 400):
+            response.raise_for_status()
+        result = response.json()
+        totals["accepted"] += result.get("accepted", 0)
+        totals["ignored"] += result.get("ignored", 0)
+        totals["rejected"] += len(result.get("rejected", []))
+
+    chunk = []
+    for event in events:
+        chunk.append(event)
+        if len(chunk) >= batch_size:
+            post(chunk)
+            chunk = []
+    if chunk:
+        post(chunk)
+    return totals
+
+
+def read_events(path):
+    """Yield the events of an NDJSON file (one event per line)."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Receive Periskope webhook events into the local store.")
+    parser.add_argument("--secret", default=os.environ.get("PERISKOPE_WEBHOOK_SECRET"),
+                        help="Shared secret of the request signature (default: $PERISKOPE_WEBHOOK_SECRET)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_cmd = commands.add_parser("serve", help="Run the receiver")
+    serve_cmd.add_argument("--host", default="127.0.0.1")
+    serve_cmd.add_argument("--port", type=int, default=8765)
+    serve_cmd.add_argument("--batch-size", type=int, default=500,
+                           help="Records per store write (default: 500)")
+    serve_cmd.add_argument("--flush-every", type=float, default=5.0,
+                           help="Seconds between timed flushes (default: 5)")
+
+    replay_cmd = commands.add_parser("replay", help="POST recorded events (NDJSON) to a receiver")
+    replay_cmd.add_argument("file")
+    replay_cmd.add_argument("--url", default="http://127.0.0.1:8765/")
+    replay_cmd.add_argument("--batch-size", type=int, default=100,
+                            help="Events per request (default: 100)")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.host, args.port, args.batch_size, args.flush_every, args.secret)
+    else:
+        totals = replay(read_events(args.file), args.url, args.batch_size, args.secret)
+        print(f"✅ Replayed: {totals['accepted']} accepted, {totals['ignored']} ignored, "
+              f"{totals['rejected']} rejected")
+
+
+if __name__ == "__main__":
+    main()